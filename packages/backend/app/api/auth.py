@@ -4,15 +4,17 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from jose import JWTError
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.security import hash_password, verify_password, create_access_token, decode_token
+from app.core.rate_limit import rate_limit
+from app.core.security import (
+    PasswordHashBusy, create_access_token, decode_token, hash_password_async, needs_rehash, verify_password_async,
+)
+from app.core.user_cache import cache_user, get_cached_user, invalidate_user
 from app.models.models import User
 from app.schemas.schemas import LoginRequest, RegisterRequest, UserResponse
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
 
 async def get_current_user(request: Request, db: AsyncSession = Depends(get_db)) -> User:
     token = request.cookies.get("auth_token")
@@ -26,23 +28,33 @@ async def get_current_user(request: Request, db: AsyncSession = Depends(get_db))
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
     
+    cached = await get_cached_user(int(user_id), token)
+    if cached:
+        # Detached copy: only the cached columns are set, never the password hash
+        return User(**cached)
+    
     result = await db.execute(select(User).where(User.id == int(user_id)))
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    await cache_user(user, token)
     return user
 
-@router.post("/login")
-@limiter.limit("5/minute")  # Max 5 login attempts per minute per IP
-async def login(request: Request, data: LoginRequest, response: Response, db: AsyncSession = Depends(get_db)):
+@router.post("/login", dependencies=[Depends(rate_limit("login", settings.LOGIN_RATE_LIMIT, fallback="local"))])
+async def login(data: LoginRequest, response: Response, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(data.password, user.password_hash):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+    try:
+        if not user or not await verify_password_async(data.password, user.password_hash):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        if needs_rehash(user.password_hash):
+            user.password_hash = await hash_password_async(data.password)
+            await db.commit()
+    except PasswordHashBusy:
+        raise HTTPException(status_code=503, detail="Too many logins in progress, try again", headers={"Retry-After": "1"})
     token = create_access_token({"sub": str(user.id)})
 
     # Set HTTP-Only cookie with environment-aware security
-    from app.core.config import settings
     is_production = settings.ENVIRONMENT == "production"
 
     response.set_cookie(
@@ -60,10 +72,16 @@ async def login(request: Request, data: LoginRequest, response: Response, db: As
 async def register(data: RegisterRequest, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
-    user = User(email=data.email, password_hash=hash_password(data.password), full_name=data.full_name, role=data.role)
+    try:
+        password_hash = await hash_password_async(data.password)
+    except PasswordHashBusy:
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
+    user = User(email=data.email, password_hash=password_hash, full_name=data.full_name, role=data.role)
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    # Nothing may survive under this id from an earlier user that held it
+    await invalidate_user(user.id)
     return user
 
 @router.get("/users", response_model=list[UserResponse])
@@ -85,6 +103,7 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db), current_
         raise HTTPException(status_code=404, detail="User not found")
     await db.delete(user)
     await db.commit()
+    await invalidate_user(user_id)
     return {"ok": True}
 
 @router.get("/me", response_model=UserResponse)
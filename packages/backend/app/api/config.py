@@ -1,26 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel
 from typing import Any
+import hashlib
 
 from app.core.database import get_db
 from app.api.auth import get_current_user
 from app.models.models import AppConfig, User
+from app.services.config_cache import get_configs, invalidate_config
 
 router = APIRouter(prefix="/config", tags=["config"])
 
+MAX_BULK_KEYS = 50
+
 class ConfigUpdate(BaseModel):
     value: Any
 
+def etag_response(request: Request, body: dict, etag: str) -> Response:
+    """body as JSON, or 304 when the client already holds etag"""
+    # Proxies that compress responses turn ETags weak, so compare the opaque part only
+    held = {tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")}
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in held or "*" in held:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+@router.get("")
+async def get_config_bulk(
+    request: Request,
+    keys: str = Query(..., description="Comma-separated config keys"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get several configs in one request (public)"""
+    names = list(dict.fromkeys(k.strip() for k in keys.split(",") if k.strip()))
+    if not names or len(names) > MAX_BULK_KEYS:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MAX_BULK_KEYS} keys")
+    configs = await get_configs(db, names)
+    etag = '"' + hashlib.sha1("".join(configs[k][1] for k in names).encode()).hexdigest() + '"'
+    return etag_response(request, {"items": [{"key": k, "value": configs[k][0]} for k in names]}, etag)
+
 @router.get("/{key}")
-async def get_config(key: str, db: AsyncSession = Depends(get_db)):
+async def get_config(key: str, request: Request, db: AsyncSession = Depends(get_db)):
     """Get config by key (public)"""
-    result = await db.execute(select(AppConfig).where(AppConfig.key == key))
-    config = result.scalar_one_or_none()
-    if not config:
-        return {"key": key, "value": None}
-    return {"key": config.key, "value": config.value}
+    value, etag = (await get_configs(db, [key]))[key]
+    return etag_response(request, {"key": key, "value": value}, etag)
 
 @router.put("/{key}")
 async def update_config(
@@ -44,4 +69,5 @@ async def update_config(
         db.add(config)
     
     await db.commit()
+    await invalidate_config(key)
     return {"key": key, "value": data.value}
@@ -1,10 +1,19 @@
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, case, or_
+from sqlalchemy import select, func, desc, case, or_, and_
 from typing import Optional, List
-from app.core.database import get_db
-from app.core.cache import cache_get, cache_set
-from app.models.models import DashboardData
+from datetime import datetime
+import csv, io, json
+from app.core.database import get_db, async_session
+from app.core.cache import cache_get, cache_set, cache_delete
+from app.core.config import settings
+from app.core.rate_limit import rate_limit
+from app.models.models import DashboardData, User
+from app.api.auth import get_current_user
+from app.services.dashboard_engine import get_snapshot
+from app.services.partitions import month_bounds
+from app.services.source_purge import live_rows
 import logging
 
 logger = logging.getLogger(__name__)
@@ -24,10 +33,22 @@ def clean_for_json(obj):
 
 # --- Helpers ---
 
+MONTH_PATTERN = r"^\d{4}-\d{2}$"
+
+def month_range(*months: str):
+    """reporting_day range covering the given YYYY-MM months.
+
+    Unlike to_char(reporting_day) this is a plain predicate on the partition
+    key, so Postgres prunes to the matching monthly partitions.
+    """
+    starts, ends = zip(*(month_bounds(m) for m in months))
+    return and_(DashboardData.reporting_day >= min(starts), DashboardData.reporting_day < max(ends))
+
 def apply_filters(query, month=None, customers=None, categories=None, statuses=None, products=None):
+    query = query.where(live_rows())
+
     if month:
-        # Postgres to_char for YYYY-MM
-        query = query.where(func.to_char(DashboardData.reporting_day, 'YYYY-MM') == month)
+        query = query.where(month_range(month))
     
     if customers:
         customer_list = [c.strip() for c in customers.split(',')]
@@ -54,11 +75,45 @@ def apply_filters(query, month=None, customers=None, categories=None, statuses=N
 async def get_available_months(db: AsyncSession) -> List[str]:
     result = await db.execute(
         select(func.to_char(DashboardData.reporting_day, 'YYYY-MM').label('month'))
+        .where(live_rows())
         .distinct()
         .order_by(desc('month'))
     )
     return [r for r in result.scalars().all() if r]
 
+async def get_source_months(db: AsyncSession, source_id: int) -> set:
+    result = await db.execute(
+        select(func.to_char(DashboardData.reporting_day, 'YYYY-MM'))
+        .where(DashboardData.source_id == source_id)
+        .distinct()
+    )
+    return set(result.scalars().all())
+
+async def invalidate_dashboard_months(db: AsyncSession, months: set, months_before: List[str]):
+    """Drop cached dashboard responses that depend on the changed months.
+
+    Call after the change is committed, with the available months as they were
+    before it. If the month list itself changed, every cached response is stale.
+    """
+    available = await get_available_months(db)
+    if available != months_before:
+        await cache_delete("dashboard:*")
+        return
+
+    keys = set()
+    for month in months & set(available):
+        idx = available.index(month)
+        keys.add(month)
+        if idx > 0:
+            keys.add(available[idx - 1])  # Uses this month as its previous month
+        if idx <= 1:
+            keys.add("None")  # No month selected means the latest one
+    for key in keys:
+        await cache_delete(f"dashboard:v1:{key}:*")
+        await cache_delete(f"dashboard:decomposition:v1:{key}")
+    await cache_delete("dashboard:comparison:*")
+    await cache_delete("dashboard:failure_trend:*")
+
 def calc_mom_change(current: dict, prev: dict) -> dict:
     if not prev or not current:
         return {}
@@ -81,38 +136,111 @@ def calc_mom_change(current: dict, prev: dict) -> dict:
         "failure_rate": pts_change(current.get("failure_rate", 0), prev.get("failure_rate", 0)),
     }
 
-async def calculate_metrics(db: AsyncSession, filters: dict) -> dict:
-    stmt = select(
-        func.sum(DashboardData.production_no).label('total_prod'),
-        func.count(DashboardData.id).label('total_rows'),
-        func.sum(case((DashboardData.status == 'LOCK', DashboardData.production_no), else_=0)).label('lock_prod'),
-        func.sum(case((DashboardData.status == 'HOLD', DashboardData.production_no), else_=0)).label('hold_prod'),
-        func.sum(case((DashboardData.status == 'FAILURE', DashboardData.production_no), else_=0)).label('fail_prod'),
-        func.sum(case((DashboardData.current_status == 'CANCELED', DashboardData.production_no), else_=0)).label('cancel_prod'),
-        
-        # Count versions for fallback
-        func.count(case((DashboardData.status == 'LOCK', 1))).label('lock_count'),
-        func.count(case((DashboardData.status == 'HOLD', 1))).label('hold_count'),
-        func.count(case((DashboardData.status == 'FAILURE', 1))).label('fail_count'),
-        func.count(case((DashboardData.current_status == 'CANCELED', 1))).label('cancel_count'),
-    )
-    stmt = apply_filters(stmt, **filters)
-    result = await db.execute(stmt)
-    row = result.one()
-    
+class SqlDashboardQueries:
+    """Raw dashboard aggregates evaluated in Postgres.
+
+    DashboardSnapshot (app.services.dashboard_engine) implements the same
+    methods over an in-memory copy of dashboard_data.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def available_months(self) -> List[str]:
+        return await get_available_months(self.db)
+
+    async def metric_totals(self, filters: dict) -> dict:
+        stmt = select(
+            func.sum(DashboardData.production_no).label('total_prod'),
+            func.count(DashboardData.id).label('total_rows'),
+            func.sum(case((DashboardData.status == 'LOCK', DashboardData.production_no), else_=0)).label('lock_prod'),
+            func.sum(case((DashboardData.status == 'HOLD', DashboardData.production_no), else_=0)).label('hold_prod'),
+            func.sum(case((DashboardData.status == 'FAILURE', DashboardData.production_no), else_=0)).label('fail_prod'),
+            func.sum(case((DashboardData.current_status == 'CANCELED', DashboardData.production_no), else_=0)).label('cancel_prod'),
+
+            # Count versions for fallback
+            func.count(case((DashboardData.status == 'LOCK', 1))).label('lock_count'),
+            func.count(case((DashboardData.status == 'HOLD', 1))).label('hold_count'),
+            func.count(case((DashboardData.status == 'FAILURE', 1))).label('fail_count'),
+            func.count(case((DashboardData.current_status == 'CANCELED', 1))).label('cancel_count'),
+        )
+        stmt = apply_filters(stmt, **filters)
+        result = await self.db.execute(stmt)
+        return dict(result.one()._mapping)
+
+    async def row_count(self, filters: dict) -> int:
+        stmt = apply_filters(select(func.count(DashboardData.id)), **filters)
+        return (await self.db.execute(stmt)).scalar() or 0
+
+    async def value_counts(self, column, filters: dict, limit: Optional[int] = None) -> list:
+        """(value, count) pairs for column, most frequent first; NULL is a value"""
+        stmt = select(column, func.count(DashboardData.id).label('cnt'))
+        stmt = apply_filters(stmt, **filters)
+        stmt = stmt.group_by(column).order_by(desc('cnt'))
+        if limit:
+            stmt = stmt.limit(limit)
+        result = await self.db.execute(stmt)
+        return [(r[0], r.cnt) for r in result.all()]
+
+    async def trend_counts(self, filters: dict) -> list:
+        """(day, status, count) triples ordered by day"""
+        stmt = select(
+            func.to_char(DashboardData.reporting_day, 'YYYY-MM-DD').label('day'),
+            DashboardData.status,
+            func.count(DashboardData.id)
+        )
+        stmt = apply_filters(stmt, **filters)
+        stmt = stmt.group_by('day', DashboardData.status).order_by('day')
+        result = await self.db.execute(stmt)
+        return [tuple(r) for r in result.all()]
+
+    async def root_cause_counts(self, filters: dict, limit: int = 20) -> list:
+        """(root_cause, count, improvement_plan) for the most frequent root causes"""
+        stmt = select(
+            DashboardData.root_cause,
+            func.count(DashboardData.id).label('cnt'),
+            func.max(DashboardData.improvement_plan).label('imp_plan') # Just take one if multiple
+        )
+        stmt = apply_filters(stmt, **filters)
+        stmt = stmt.where(DashboardData.root_cause.is_not(None))
+        stmt = stmt.group_by(DashboardData.root_cause).order_by(desc('cnt')).limit(limit)
+        result = await self.db.execute(stmt)
+        return [tuple(r) for r in result.all()]
+
+    async def distinct_values(self, column, month: Optional[str]) -> List[str]:
+        q = select(column).where(live_rows()).distinct().order_by(column)
+        if month:
+            q = q.where(month_range(month))
+        res = await self.db.execute(q)
+        return [str(r) for r in res.scalars().all() if r is not None]
+
+async def get_dashboard_queries(db: AsyncSession):
+    """Pick the aggregation engine configured by DASHBOARD_ENGINE.
+
+    Falls back to Postgres whenever the in-memory snapshot cannot be used.
+    """
+    if settings.DASHBOARD_ENGINE == "memory":
+        snapshot = await get_snapshot(db)
+        if snapshot is not None:
+            return snapshot
+    return SqlDashboardQueries(db)
+
+async def calculate_metrics(queries, filters: dict) -> dict:
+    row = await queries.metric_totals(filters)
+
     # Use Production No sum if available (>0), else use row counts
-    total = row.total_prod or 0
-    if total == 0 and (row.total_rows or 0) > 0:
-        total = row.total_rows or 0
-        lock = row.lock_count or 0
-        hold = row.hold_count or 0
-        failure = row.fail_count or 0
-        canceled = row.cancel_count or 0
+    total = row["total_prod"] or 0
+    if total == 0 and (row["total_rows"] or 0) > 0:
+        total = row["total_rows"] or 0
+        lock = row["lock_count"] or 0
+        hold = row["hold_count"] or 0
+        failure = row["fail_count"] or 0
+        canceled = row["cancel_count"] or 0
     else:
-        lock = row.lock_prod or 0
-        hold = row.hold_prod or 0
-        failure = row.fail_prod or 0
-        canceled = row.cancel_prod or 0
+        lock = row["lock_prod"] or 0
+        hold = row["hold_prod"] or 0
+        failure = row["fail_prod"] or 0
+        canceled = row["cancel_prod"] or 0
 
     resume_success_rate = round((total - canceled) / total * 100, 1) if total else 0
     hold_rate = round(hold / total * 100, 1) if total else 0
@@ -128,38 +256,107 @@ async def calculate_metrics(db: AsyncSession, filters: dict) -> dict:
         "failure_rate": failure_rate,
     }
 
-async def get_top_item(db: AsyncSession, column, filters):
-    stmt = select(column, func.count(DashboardData.id).label('cnt'))
-    stmt = apply_filters(stmt, **filters)
-    stmt = stmt.group_by(column).order_by(desc('cnt')).limit(1)
-    result = await db.execute(stmt)
-    row = result.first()
-    
-    total_stmt = select(func.count(DashboardData.id))
-    total_stmt = apply_filters(total_stmt, **filters)
-    total_res = await db.execute(total_stmt)
-    total = total_res.scalar() or 0
-    
-    if row and total > 0:
-        return {"name": str(row[0]), "percent": round(row[1] / total * 100, 1)}
+async def get_top_item(queries, column, filters):
+    top = await queries.value_counts(column, filters, limit=1)
+    total = await queries.row_count(filters)
+
+    if top and total > 0:
+        name, cnt = top[0]
+        return {"name": str(name), "percent": round(cnt / total * 100, 1)}
     return None
 
-async def get_chart_data(db: AsyncSession, column, filters):
-    stmt = select(column, func.count(DashboardData.id).label('cnt'))
-    stmt = apply_filters(stmt, **filters)
-    stmt = stmt.group_by(column).order_by(desc('cnt'))
-    result = await db.execute(stmt)
-    rows = result.all()
-    
-    total = sum(r.cnt for r in rows) if rows else 0
-    return [{"name": str(r[0]) if r[0] is not None else "Blank", "count": int(r.cnt), "percent": round(r.cnt / total * 100, 1) if total else 0} for r in rows]
+async def get_chart_data(queries, column, filters):
+    rows = await queries.value_counts(column, filters)
+
+    total = sum(cnt for _, cnt in rows) if rows else 0
+    return [{"name": str(val) if val is not None else "Blank", "count": int(cnt), "percent": round(cnt / total * 100, 1) if total else 0} for val, cnt in rows]
+
+async def build_dashboard(queries, month=None, customers=None, categories=None, statuses=None, products=None) -> dict:
+    available_months = await queries.available_months()
+    selected_month = month or (available_months[0] if available_months else None)
+
+    # Determine previous month
+    prev_month = None
+    if selected_month and selected_month in available_months:
+        idx = available_months.index(selected_month)
+        if idx + 1 < len(available_months):
+            prev_month = available_months[idx + 1]
+
+    # Filters for current query
+    current_filters = {
+        "month": selected_month,
+        "customers": customers,
+        "categories": categories,
+        "statuses": statuses,
+        "products": products
+    }
+
+    # KPIs
+    kpis = await calculate_metrics(queries, current_filters)
+
+    # Previous Month KPIs (only filtering by month, keeping other filters? usually MoM compares same segment)
+    prev_filters = current_filters.copy()
+    prev_filters["month"] = prev_month
+    prev_kpis = await calculate_metrics(queries, prev_filters) if prev_month else {}
+
+    mom_change = calc_mom_change(kpis, prev_kpis)
+
+    # Top Items
+    kpis["top_category"] = await get_top_item(queries, DashboardData.category, current_filters)
+    kpis["top_customer"] = await get_top_item(queries, DashboardData.customer, current_filters)
+
+    # Charts
+    charts = {
+        "by_customer": await get_chart_data(queries, DashboardData.customer, current_filters),
+        "by_category": await get_chart_data(queries, DashboardData.category, current_filters),
+        "by_status": await get_chart_data(queries, DashboardData.status, current_filters),
+    }
+
+    # Trend Chart - process into expected format
+    trend_data = {}
+    for day, status, count in await queries.trend_counts(current_filters):
+        if day not in trend_data: trend_data[day] = {"date": day}
+        trend_data[day][status] = count
+    charts["trend"] = list(trend_data.values())
+
+    # Root Causes
+    total_rows = kpis["total_orders"] # Approx base
+    root_causes = [
+        {
+            "root_cause": root_cause,
+            "count": int(cnt),
+            "improvement_plan": imp_plan,
+            "percent": round(cnt / total_rows * 100, 1) if total_rows else 0
+        } for root_cause, cnt, imp_plan in await queries.root_cause_counts(current_filters)
+    ]
+
+    # Filter Options (Distinct values for dropdowns, scoped to selected month usually or global?)
+    # Original code scoped to selected month.
+    filter_options = {
+        "months": available_months,
+        "customers": await queries.distinct_values(DashboardData.customer, selected_month),
+        "categories": await queries.distinct_values(DashboardData.category, selected_month),
+        "statuses": await queries.distinct_values(DashboardData.status, selected_month),
+        "products": await queries.distinct_values(DashboardData.product, selected_month),
+    }
+
+    return {
+        "kpis": kpis,
+        "prev_month_kpis": prev_kpis,
+        "mom_change": mom_change,
+        "charts": charts,
+        "root_causes": root_causes,
+        "filters": filter_options,
+        "selected_month": selected_month,
+        "prev_month": prev_month,
+    }
 
 # --- Endpoints ---
 
 @router.get("")
 async def get_dashboard(
     db: AsyncSession = Depends(get_db),
-    month: Optional[str] = Query(None),
+    month: Optional[str] = Query(None, regex=MONTH_PATTERN),
     customers: Optional[str] = Query(None),
     categories: Optional[str] = Query(None),
     statuses: Optional[str] = Query(None),
@@ -171,112 +368,9 @@ async def get_dashboard(
         cached = await cache_get(cache_key)
         if cached: return cached
 
-        available_months = await get_available_months(db)
-        selected_month = month or (available_months[0] if available_months else None)
-        
-        # Determine previous month
-        prev_month = None
-        if selected_month and selected_month in available_months:
-            idx = available_months.index(selected_month)
-            if idx + 1 < len(available_months):
-                prev_month = available_months[idx + 1]
-
-        # Filters for current query
-        current_filters = {
-            "month": selected_month,
-            "customers": customers,
-            "categories": categories,
-            "statuses": statuses,
-            "products": products
-        }
-
-        # KPIs
-        kpis = await calculate_metrics(db, current_filters)
-        
-        # Previous Month KPIs (only filtering by month, keeping other filters? usually MoM compares same segment)
-        prev_filters = current_filters.copy()
-        prev_filters["month"] = prev_month
-        prev_kpis = await calculate_metrics(db, prev_filters) if prev_month else {}
-        
-        mom_change = calc_mom_change(kpis, prev_kpis)
-
-        # Top Items
-        kpis["top_category"] = await get_top_item(db, DashboardData.category, current_filters)
-        kpis["top_customer"] = await get_top_item(db, DashboardData.customer, current_filters)
-
-        # Charts
-        charts = {
-            "by_customer": await get_chart_data(db, DashboardData.customer, current_filters),
-            "by_category": await get_chart_data(db, DashboardData.category, current_filters),
-            "by_status": await get_chart_data(db, DashboardData.status, current_filters),
-        }
-
-        # Trend Chart
-        trend_stmt = select(
-            func.to_char(DashboardData.reporting_day, 'YYYY-MM-DD').label('day'),
-            DashboardData.status,
-            func.count(DashboardData.id)
-        )
-        trend_stmt = apply_filters(trend_stmt, **current_filters)
-        trend_stmt = trend_stmt.group_by('day', DashboardData.status).order_by('day')
-        trend_res = await db.execute(trend_stmt)
-        
-        # Process trend data into expected format
-        trend_data = {}
-        for day, status, count in trend_res.all():
-            if day not in trend_data: trend_data[day] = {"date": day}
-            trend_data[day][status] = count
-        charts["trend"] = list(trend_data.values())
-
-        # Root Causes
-        rc_stmt = select(
-            DashboardData.root_cause, 
-            func.count(DashboardData.id).label('cnt'),
-            func.max(DashboardData.improvement_plan).label('imp_plan') # Just take one if multiple
-        )
-        rc_stmt = apply_filters(rc_stmt, **current_filters)
-        rc_stmt = rc_stmt.where(DashboardData.root_cause.is_not(None))
-        rc_stmt = rc_stmt.group_by(DashboardData.root_cause).order_by(desc('cnt')).limit(20)
-        rc_res = await db.execute(rc_stmt)
-        
-        total_rows = kpis["total_orders"] # Approx base
-        root_causes = [
-            {
-                "root_cause": r.root_cause,
-                "count": int(r.cnt),
-                "improvement_plan": r.imp_plan,
-                "percent": round(r.cnt / total_rows * 100, 1) if total_rows else 0
-            } for r in rc_res.all()
-        ]
-
-        # Filter Options (Distinct values for dropdowns, scoped to selected month usually or global?)
-        # Original code scoped to selected month.
-        async def get_distinct_vals(col):
-            q = select(col).distinct().order_by(col)
-            if selected_month:
-                q = q.where(func.to_char(DashboardData.reporting_day, 'YYYY-MM') == selected_month)
-            res = await db.execute(q)
-            return [str(r) for r in res.scalars().all() if r is not None]
-
-        filter_options = {
-            "months": available_months,
-            "customers": await get_distinct_vals(DashboardData.customer),
-            "categories": await get_distinct_vals(DashboardData.category),
-            "statuses": await get_distinct_vals(DashboardData.status),
-            "products": await get_distinct_vals(DashboardData.product),
-        }
+        queries = await get_dashboard_queries(db)
+        response = await build_dashboard(queries, month, customers, categories, statuses, products)
 
-        response = {
-            "kpis": kpis,
-            "prev_month_kpis": prev_kpis,
-            "mom_change": mom_change,
-            "charts": charts,
-            "root_causes": root_causes,
-            "filters": filter_options,
-            "selected_month": selected_month,
-            "prev_month": prev_month,
-        }
-        
         cleaned_response = clean_for_json(response)
         await cache_set(cache_key, cleaned_response, ttl=300)
         return cleaned_response
@@ -288,7 +382,7 @@ async def get_dashboard(
 @router.get("/decomposition")
 async def get_decomposition_data(
     db: AsyncSession = Depends(get_db),
-    month: Optional[str] = Query(None),
+    month: Optional[str] = Query(None, regex=MONTH_PATTERN),
 ):
     """Get hierarchical decomposition tree data"""
     cache_key = f"dashboard:decomposition:v1:{month}"
@@ -308,7 +402,7 @@ async def get_decomposition_data(
         DashboardData.category,
         DashboardData.root_cause,
         func.count(DashboardData.id).label('cnt')
-    ).where(func.to_char(DashboardData.reporting_day, 'YYYY-MM') == selected_month)
+    ).where(month_range(selected_month), live_rows())
     stmt = stmt.group_by(DashboardData.status, DashboardData.customer, DashboardData.category, DashboardData.root_cause)
     result = await db.execute(stmt)
     rows = result.all()
@@ -406,7 +500,7 @@ async def get_comparison_data(
         func.count(case((DashboardData.status == 'HOLD', 1))).label('hold'),
         func.count(case((DashboardData.status == 'FAILURE', 1))).label('failure'),
         func.count(case((DashboardData.current_status == 'CANCELED', 1))).label('canceled')
-    ).where(func.to_char(DashboardData.reporting_day, 'YYYY-MM').in_(target_months))
+    ).where(month_range(*target_months), live_rows())
     stmt = stmt.group_by('month').order_by('month')
     
     result = await db.execute(stmt)
@@ -464,12 +558,15 @@ async def get_failure_trend(
     available_months = await get_available_months(db)
     target_months = available_months[:months]
     target_months.reverse()
+
+    if not target_months:
+        return {"data": []}
     
     stmt = select(
         func.to_char(DashboardData.reporting_day, 'YYYY-MM').label('month'),
         func.count(DashboardData.id).label('total'),
         func.count(case((DashboardData.current_status == 'CANCELED', 1))).label('canceled')
-    ).where(func.to_char(DashboardData.reporting_day, 'YYYY-MM').in_(target_months))
+    ).where(month_range(*target_months), live_rows())
     stmt = stmt.group_by('month').order_by('month')
     
     result = await db.execute(stmt)
@@ -492,16 +589,16 @@ async def get_drilldown_data(
     db: AsyncSession = Depends(get_db),
     dimension: str = Query(..., description="customer or category"),
     value: str = Query(..., description="The value to filter by"),
-    month: Optional[str] = Query(None),
+    month: Optional[str] = Query(None, regex=MONTH_PATTERN),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=200),
 ):
     available_months = await get_available_months(db)
     selected_month = month or (available_months[0] if available_months else None)
     
-    query = select(DashboardData)
+    query = select(DashboardData).where(live_rows())
     if selected_month:
-        query = query.where(func.to_char(DashboardData.reporting_day, 'YYYY-MM') == selected_month)
+        query = query.where(month_range(selected_month))
         
     if dimension == 'customer':
         if value == 'Blank': query = query.where(DashboardData.customer.is_(None))
@@ -541,3 +638,135 @@ async def get_drilldown_data(
         "dimension": dimension,
         "value": value
     }
+
+# --- Export ---
+
+# Output columns for /export (header label -> DashboardData attribute)
+EXPORT_COLUMNS = {
+    "Production Order No.": "production_order_no",
+    "Production No": "production_no",
+    "Customer": "customer",
+    "Category": "category",
+    "Product": "product",
+    "Status": "status",
+    "Current status": "current_status",
+    "Root cause": "root_cause",
+    "Improvement plan": "improvement_plan",
+    "Reporting day": "reporting_day",
+}
+EXPORT_BATCH_SIZE = 5000
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+async def iter_export_batches(filters: dict):
+    """Yield row batches for the filtered export through a server-side cursor.
+
+    Uses its own session: dependency-managed sessions are closed before a
+    StreamingResponse body is sent.
+    """
+    stmt = select(*[getattr(DashboardData, attr) for attr in EXPORT_COLUMNS.values()])
+    stmt = apply_filters(stmt, **filters).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    async with async_session() as db:
+        result = await db.stream(stmt)
+        async for batch in result.partitions():
+            yield batch
+
+async def export_csv(filters: dict):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS.keys())
+    async for batch in iter_export_batches(filters):
+        writer.writerows(batch)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+async def export_ndjson(filters: dict):
+    labels = list(EXPORT_COLUMNS.keys())
+    async for batch in iter_export_batches(filters):
+        lines = [json.dumps(dict(zip(labels, row)), default=str) for row in batch]
+        yield ("\n".join(lines) + "\n").encode()
+
+class _ParquetSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to the caller.
+
+    Tracks its own position so the Parquet footer offsets stay valid after
+    earlier chunks have been sent and released.
+    """
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def export_parquet(filters: dict):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {"production_no": pa.int64(), "reporting_day": pa.date32()}
+    schema = pa.schema([(label, arrow_types.get(attr, pa.string())) for label, attr in EXPORT_COLUMNS.items()])
+
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        async for batch in iter_export_batches(filters):
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema
+            ))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+EXPORT_WRITERS = {"csv": export_csv, "ndjson": export_ndjson, "parquet": export_parquet}
+
+@router.get("/export", dependencies=[Depends(rate_limit("dashboard-export", settings.EXPORT_RATE_LIMIT, per="user"))])
+async def export_dashboard_data(
+    format: str = Query("csv", regex="^(csv|ndjson|parquet)$"),
+    month: Optional[str] = Query(None, regex=MONTH_PATTERN),
+    customers: Optional[str] = Query(None),
+    categories: Optional[str] = Query(None),
+    statuses: Optional[str] = Query(None),
+    products: Optional[str] = Query(None),
+    user: User = Depends(get_current_user),
+):
+    """Stream all rows matching the dashboard filters as CSV, NDJSON or Parquet.
+
+    Rows are fetched in batches of EXPORT_BATCH_SIZE and written as they arrive,
+    so memory stays constant and a slow client throttles the cursor.
+    """
+    filters = {
+        "month": month,
+        "customers": customers,
+        "categories": categories,
+        "statuses": statuses,
+        "products": products,
+    }
+    filename = f"dashboard_{month or 'all'}_{datetime.now():%Y%m%d%H%M%S}.{format}"
+    return StreamingResponse(
+        EXPORT_WRITERS[format](filters),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,17 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, BackgroundTasks, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, insert, delete, func
+from sqlalchemy import select, insert, func
+from typing import List, Union
+import asyncio
+from datetime import datetime
+import hashlib
+import json
 import os, uuid
 import pandas as pd
+import pyarrow as pa
 import logging
 import magic
 from app.core.database import get_db, async_session
 from app.core.config import settings
-from app.core.cache import cache_delete
+from app.core.cache import bump_data_generation, cache_get, cache_set, cache_delete
+from app.core.rate_limit import rate_limit
 from app.models.models import User, DataSource, DashboardData
 from app.api.auth import get_current_user
+from app.api.dashboard import clean_for_json, get_available_months, get_source_months, invalidate_dashboard_months
 from app.schemas.schemas import DataSourceResponse
-from app.services.data_processor import FileParser, SchemaDetector, DataValidator
+from app.services.data_processor import FileParser, SchemaDetector, DataValidator, DataTransformer
+from app.services.partitions import ensure_month_partitions
+from app.services.source_purge import purge_source_task
+from app.services.dashboard_merge import MERGE_COLUMNS, merge_dashboard_rows, merge_key_columns
+from app.services.source_store import build_source_store, drop_source_store, get_source_store
+from app.services.telemetry import IngestTelemetry
+from app.services.isc_store import merge_isc_upload
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -24,6 +38,20 @@ def normalize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
         df['Production No'] = pd.to_numeric(df['Production No'], errors='coerce').fillna(0).astype(int)
     return df
 
+async def find_cross_source_duplicates(db: AsyncSession, source_id: int) -> list[dict]:
+    """Live sources holding rows with the same fingerprint as rows of source_id"""
+    hashes = select(DashboardData.row_hash).where(
+        DashboardData.source_id == source_id, DashboardData.row_hash.is_not(None)
+    )
+    result = await db.execute(
+        select(DataSource.id, DataSource.name, func.count())
+        .join(DashboardData, DashboardData.source_id == DataSource.id)
+        .where(DashboardData.row_hash.in_(hashes), DataSource.id != source_id, DataSource.deleted_at.is_(None))
+        .group_by(DataSource.id, DataSource.name)
+        .order_by(func.count().desc())
+    )
+    return [{"source_id": sid, "name": name, "duplicate_rows": cnt} for sid, name, cnt in result.all()]
+
 def process_isc_data(df: pd.DataFrame) -> pd.DataFrame:
     """Process ISC data: only keep Item code and Avg Consume, convert Avg Consume to positive"""
     required_cols = ['Item code', 'Avg Consume']
@@ -41,8 +69,88 @@ def process_isc_data(df: pd.DataFrame) -> pd.DataFrame:
     
     return df_result
 
-async def process_upload_task(source_id: int, file_path: str, data_type: str):
-    """Background task to process uploaded file"""
+def is_shared_file(source: DataSource) -> bool:
+    """Sheet sources share their workbook with the other sheets' sources"""
+    return source.sheet_name is not None
+
+def workbook_options(source: DataSource) -> dict:
+    """FileParser.parse / get_source_store arguments reading the sheets the source was ingested from"""
+    return {"sheet": source.sheet_name, "combine": source.sheet_mode == "combine"}
+
+async def remove_source_file(db: AsyncSession, file_path: str):
+    """Remove an uploaded file once no remaining source refers to it"""
+    if not file_path or not os.path.exists(file_path):
+        return
+    in_use = await db.scalar(select(func.count()).where(DataSource.file_path == file_path))
+    if not in_use:
+        os.remove(file_path)
+
+DASHBOARD_COLUMNS = {
+    'Production Order No.': 'production_order_no',
+    'Reporting day': 'reporting_day',
+    'Customer': 'customer',
+    'Category': 'category',
+    'Product': 'product',
+    'Status': 'status',
+    'Current status': 'current_status',
+    'Currrent status': 'current_status', # Handle typo
+    'Production No': 'production_no',
+    'Root cause': 'root_cause',
+    'Improvement plan': 'improvement_plan'
+}
+
+def dashboard_records(df: pd.DataFrame, source_id: int) -> list[dict]:
+    """Map a normalized frame to DashboardData rows, each with its row_hash fingerprint"""
+    db_data = []
+    for row in df.to_dict('records'):
+        record = {'source_id': source_id}
+        for csv_col, db_col in DASHBOARD_COLUMNS.items():
+            if csv_col in row:
+                val = row[csv_col]
+                if pd.isna(val):
+                    val = None
+                elif db_col == 'reporting_day' and val:
+                    # Convert string to date
+                    try:
+                        val = datetime.strptime(str(val)[:10], '%Y-%m-%d').date()
+                    except (ValueError, TypeError):
+                        val = None
+                elif db_col == 'production_no':
+                    # Ensure integer
+                    try:
+                        val = int(float(val)) if val else 0
+                    except (ValueError, TypeError):
+                        val = 0
+                elif db_col == 'production_order_no':
+                    # Read as float when the column has blanks
+                    val = str(int(val)) if isinstance(val, float) and val.is_integer() else str(val).strip()
+                record[db_col] = val
+        db_data.append(record)
+    if db_data:
+        # Fingerprint each row for duplicate checks within and across sources
+        row_hashes = DataValidator.row_hashes(pd.DataFrame(db_data, columns=MERGE_COLUMNS, dtype=object))
+        for record, row_hash in zip(db_data, row_hashes.tolist()):
+            record['row_hash'] = row_hash
+    return db_data
+
+def missing_merge_keys(df: pd.DataFrame) -> list[str]:
+    """Merge key columns (merge_key_columns) the frame lacks or has no value for in any row"""
+    missing = []
+    for key in merge_key_columns():
+        cols = [c for c, db_col in DASHBOARD_COLUMNS.items() if db_col == key and c in df.columns]
+        if all(df[c].isna().all() for c in cols):
+            missing.append(key)
+    return missing
+
+async def process_upload_task(
+    source_id: int, file_path: str, data_type: str, mode: str = "append",
+    sheets: str = "first", df_new: pd.DataFrame = None, telemetry: IngestTelemetry = None
+):
+    """Background task to process uploaded file.
+
+    df_new is the already parsed sheet when called from process_workbook_task.
+    """
+    telemetry = telemetry or IngestTelemetry()
     async with async_session() as db:
         try:
             # Fetch source
@@ -50,90 +158,125 @@ async def process_upload_task(source_id: int, file_path: str, data_type: str):
             source = result.scalar_one_or_none()
             if not source:
                 return
+            # Read before the error path's rollback expires the instance
+            shared_file = is_shared_file(source)
 
             try:
-                df_new = FileParser.parse(file_path)
+                # The whole file is parsed into one frame: the source store, schema and
+                # validation read every row. Only the dashboard rows below are mapped and
+                # written in chunks, so ingestion memory still grows with the file
+                if df_new is None:
+                    df_new = await asyncio.to_thread(FileParser.parse, file_path, combine=(sheets == "combine"))
+                    telemetry.lap("parse", rows=len(df_new))
+                # Search/sort index for the data browser, built from the file as uploaded
+                await asyncio.to_thread(build_source_store, source_id, df_new)
+                telemetry.lap("index", rows=len(df_new))
                 
                 # Process based on data_type
                 if data_type == "isc":
                     df_new = process_isc_data(df_new)
                 else:
                     df_new = normalize_dataframe(df_new)
+                telemetry.lap("normalize", rows=len(df_new))
 
                 # --- Database Ingestion for Dashboard Data ---
+                changed_months = set()
                 if data_type == "dashboard":
-                    # Map DataFrame columns to DashboardData model
-                    column_mapping = {
-                        'Reporting day': 'reporting_day',
-                        'Customer': 'customer',
-                        'Category': 'category',
-                        'Product': 'product',
-                        'Status': 'status',
-                        'Current status': 'current_status',
-                        'Currrent status': 'current_status', # Handle typo
-                        'Production No': 'production_no',
-                        'Root cause': 'root_cause',
-                        'Improvement plan': 'improvement_plan'
-                    }
-
-                    # Prepare data for insertion
-                    # FIX: Use vectorized operations instead of slow iterrows()
-                    db_data = []
-                    
-                    from datetime import datetime
-                    # Convert entire DataFrame to dict records at once (much faster)
-                    records = df_new.to_dict('records')
-                    
-                    for row in records:
-                        record = {'source_id': source_id}
-                        for csv_col, db_col in column_mapping.items():
-                            if csv_col in row:
-                                val = row[csv_col]
-                                if pd.isna(val):
-                                    val = None
-                                elif db_col == 'reporting_day' and val:
-                                    # Convert string to date
-                                    try:
-                                        val = datetime.strptime(str(val)[:10], '%Y-%m-%d').date()
-                                    except (ValueError, TypeError):
-                                        val = None
-                                elif db_col == 'production_no':
-                                    # Ensure integer
-                                    try:
-                                        val = int(float(val)) if val else 0
-                                    except (ValueError, TypeError):
-                                        val = 0
-                                record[db_col] = val
-                        db_data.append(record)
-                    
-                    if db_data:
-                        # Chunked insert to avoid packet size issues if file is large
-                        chunk_size = 1000
-                        for i in range(0, len(db_data), chunk_size):
-                            await db.execute(insert(DashboardData), db_data[i:i + chunk_size])
-                        
+                    if mode == "merge":
+                        missing_keys = missing_merge_keys(df_new)
+                        if missing_keys:
+                            # Rows without a key never match, so the merge would insert a full copy
+                            raise ValueError(f"Merge upload has no values for merge key column(s) {missing_keys}")
+
+                    # Partitions are created on their own connection and need an exclusive
+                    # lock on dashboard_data, so they must exist before this transaction
+                    # first touches the table, even to read it
+                    if 'Reporting day' in df_new.columns:
+                        days = pd.to_datetime(df_new['Reporting day'].astype(str).str[:10], format='%Y-%m-%d', errors='coerce')
+                        await ensure_month_partitions(days.dropna().dt.date.unique())
+                    telemetry.lap("partitions")
+
+                    months_before = await get_available_months(db)
+
+                    undated = written = 0
+
+                    async def record_chunks():
+                        """Mapped, fingerprinted records, CHUNK_ROWS at a time"""
+                        nonlocal undated, written
+                        for start in range(0, len(df_new), FileParser.CHUNK_ROWS):
+                            db_data = dashboard_records(df_new.iloc[start:start + FileParser.CHUNK_ROWS], source_id)
+                            # reporting_day is the partition key; undated rows cannot be stored
+                            dated = [r for r in db_data if r.get('reporting_day')]
+                            undated += len(db_data) - len(dated)
+                            written += len(dated)
+                            if dated:
+                                yield dated
+
+                    if mode == "merge":
+                        # Only new or changed rows are written
+                        stats = await merge_dashboard_rows(db, source_id, record_chunks())
+                        await db.commit()
+                        source.merge_stats = stats
+                        changed_months = set(stats["months"])
+                        telemetry.lap("merge", rows=written)
+                    else:
+                        async for db_data in record_chunks():
+                            # Chunked insert to avoid packet size issues if file is large
+                            chunk_size = 1000
+                            for i in range(0, len(db_data), chunk_size):
+                                await db.execute(insert(DashboardData), db_data[i:i + chunk_size])
+                            changed_months.update(f"{r['reporting_day']:%Y-%m}" for r in db_data)
+
                         # Commit after all chunks
                         await db.commit()
-                        logger.info(f"Successfully inserted {len(db_data)} records for source {source_id}")
+                        logger.info(f"Successfully inserted {written} records for source {source_id}")
+                        telemetry.lap("insert", rows=written)
+                    if undated:
+                        logger.warning(f"Skipped {undated} rows without a valid Reporting day for source {source_id}")
 
                 # ---------------------------------------------
                 
                 schema = SchemaDetector.detect_schema(df_new)
+                telemetry.lap("schema", rows=len(df_new))
                 validation = DataValidator.validate(df_new)
+                if changed_months:
+                    duplicates = await find_cross_source_duplicates(db, source_id)
+                    validation["cross_source_duplicates"] = duplicates
+                    if duplicates:
+                        validation["warnings"].append(
+                            f"Rows also present in {len(duplicates)} other source(s): "
+                            + ", ".join(d["name"] for d in duplicates[:5])
+                        )
                 
                 # Update source info - wrapped in transaction
                 source.row_count = validation["row_count"]
                 source.column_count = validation["column_count"]
                 source.columns_meta = schema
+                source.validation = validation
                 source.status = "ready"
-                await db.commit()
+                telemetry.lap("validate", rows=source.row_count)
+                if data_type == "isc":
+                    # Upsert into the versioned master; it goes live only once the source is committed
+                    async with merge_isc_upload(df_new, source_id) as stats:
+                        source.merge_stats = stats
+                        await db.commit()
+                    telemetry.lap("publish", rows=len(df_new))
+                else:
+                    await db.commit()
                 logger.info(f"Source {source_id} processed successfully: {source.row_count} rows")
                 
-                # Clear dashboard cache
+                # Clear cached dashboards for the months this upload changed
                 try:
-                    await cache_delete("dashboard:*")
+                    if changed_months:
+                        await invalidate_dashboard_months(db, changed_months, months_before)
+                        await bump_data_generation()
                 except Exception as cache_err:
                     logger.warning(f"Failed to clear cache: {cache_err}")
+                telemetry.lap("cache_invalidation")
+                
+                source.ingest_metrics = telemetry.summary()
+                await db.commit()
+                telemetry.log(source_id)
                     
             except Exception as e:
                 logger.error(f"Error processing file for source {source_id}: {e}", exc_info=True)
@@ -141,10 +284,13 @@ async def process_upload_task(source_id: int, file_path: str, data_type: str):
                 await db.rollback()
                 source.status = "error"
                 source.error_message = str(e)
+                # Stages completed before the failure
+                source.ingest_metrics = telemetry.summary()
                 await db.commit()
                 
                 # Clean up file on error
-                if os.path.exists(file_path):
+                drop_source_store(source_id)
+                if os.path.exists(file_path) and not shared_file:
                     try:
                         os.remove(file_path)
                         logger.info(f"Cleaned up file after error: {file_path}")
@@ -155,17 +301,40 @@ async def process_upload_task(source_id: int, file_path: str, data_type: str):
             # Fatal error
             logger.error(f"Fatal error in background upload task for source {source_id}: {e}", exc_info=True)
 
-@router.post("/upload", response_model=DataSourceResponse)
+async def process_workbook_task(source_ids: dict, file_path: str, data_type: str, mode: str = "append"):
+    """Background task for sheets=separate: parse all sheets in parallel, then ingest each into its source"""
+    telemetry = IngestTelemetry()
+    try:
+        frames = await asyncio.to_thread(FileParser.parse_sheets, file_path, list(source_ids))
+        telemetry.lap("parse", rows=sum(len(df) for df in frames.values()))
+    except Exception as e:
+        logger.error(f"Error parsing workbook {file_path}: {e}", exc_info=True)
+        async with async_session() as db:
+            result = await db.execute(select(DataSource).where(DataSource.id.in_(source_ids.values())))
+            for source in result.scalars():
+                source.status = "error"
+                source.error_message = str(e)
+            await db.commit()
+        return
+    for sheet, source_id in source_ids.items():
+        # Each sheet's metrics start with the workbook parse, marked as shared
+        await process_upload_task(
+            source_id, file_path, data_type, mode, df_new=frames[sheet], telemetry=IngestTelemetry(telemetry.stages)
+        )
+
+@router.post("/upload", response_model=Union[DataSourceResponse, List[DataSourceResponse]])
 async def upload(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     data_type: str = Query("dashboard", regex="^(dashboard|isc)$"),
+    mode: str = Query("append", regex="^(append|merge)$"),
+    sheets: str = Query("first", regex="^(first|combine|separate)$"),
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     # Check file extension
     ext = os.path.splitext(file.filename)[1].lower()
-    if ext not in ['.csv', '.xlsx', '.xls', '.json']:
+    if ext not in ['.csv', '.xlsx', '.xls', '.json', '.ndjson', '.jsonl']:
         raise HTTPException(400, "Unsupported file extension")
 
     # Read file content
@@ -180,6 +349,8 @@ async def upload(
         '.xlsx': ['application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'],
         '.xls': ['application/vnd.ms-excel'],
         '.json': ['application/json', 'text/plain'],
+        '.ndjson': ['application/x-ndjson', 'application/json', 'text/plain'],
+        '.jsonl': ['application/x-ndjson', 'application/json', 'text/plain'],
     }
 
     # Validate MIME type matches extension
@@ -195,17 +366,34 @@ async def upload(
     with open(filepath, "wb") as f:
         f.write(content)
     
+    # One source per sheet; the sheets are parsed together in parallel
+    if sheets == "separate" and ext in ['.xlsx', '.xls']:
+        sheet_names = await asyncio.to_thread(FileParser.sheet_names, filepath)
+        sources = [DataSource(
+            user_id=user.id, name=f"{file.filename} [{sheet}]", file_type=ext[1:], file_path=filepath,
+            file_size=len(content), data_type=data_type, status="pending", sheet_name=sheet, sheet_mode=sheets
+        ) for sheet in sheet_names]
+        db.add_all(sources)
+        await db.commit()
+        for source in sources:
+            await db.refresh(source)
+        background_tasks.add_task(
+            process_workbook_task, {s.sheet_name: s.id for s in sources}, filepath, data_type, mode
+        )
+        return sources
+    
     # Create DataSource immediately
     source = DataSource(
         user_id=user.id, name=file.filename, file_type=ext[1:], file_path=filepath,
-        file_size=len(content), data_type=data_type, status="pending"
+        file_size=len(content), data_type=data_type, status="pending",
+        sheet_mode=sheets if ext in ['.xlsx', '.xls'] else None
     )
     db.add(source)
     await db.commit()
     await db.refresh(source)
     
     # Offload processing
-    background_tasks.add_task(process_upload_task, source.id, filepath, data_type)
+    background_tasks.add_task(process_upload_task, source.id, filepath, data_type, mode, sheets)
     
     return source
 
@@ -218,7 +406,7 @@ async def list_sources(
     user: User = Depends(get_current_user)
 ):
     # Build base query
-    query = select(DataSource).where(DataSource.user_id == user.id)
+    query = select(DataSource).where(DataSource.user_id == user.id, DataSource.deleted_at.is_(None))
     if search:
         query = query.where(DataSource.name.ilike(f"%{search}%"))
     
@@ -243,85 +431,151 @@ async def list_sources(
 
 # ============ SINGLE DATA SOURCE ROUTES ============
 
-@router.get("/{id}")
-async def get_source(id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    result = await db.execute(select(DataSource).where(DataSource.id == id, DataSource.user_id == user.id))
+async def get_user_source(db: AsyncSession, id: int, user: User) -> DataSource:
+    """Fetch a live (not soft-deleted) source owned by user, or 404"""
+    result = await db.execute(select(DataSource).where(
+        DataSource.id == id, DataSource.user_id == user.id, DataSource.deleted_at.is_(None)
+    ))
     source = result.scalar_one_or_none()
     if not source:
         raise HTTPException(404, "Not found")
+    return source
+
+@router.get("/{id}")
+async def get_source(id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+    source = await get_user_source(db, id, user)
     return {
         "id": source.id, "name": source.name, "file_type": source.file_type, "columns": source.columns_meta,
         "row_count": source.row_count, "column_count": source.column_count, "data_type": source.data_type,
         "status": source.status, "created_at": source.created_at.isoformat() if source.created_at else None
     }
 
+@router.get("/{id}/ingestion")
+async def get_ingestion_metrics(id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+    """Per-stage timings, throughput and peak memory recorded when the source was ingested"""
+    source = await get_user_source(db, id, user)
+    return {
+        "id": source.id, "status": source.status, "row_count": source.row_count,
+        "file_size": source.file_size, "metrics": source.ingest_metrics, "merge_stats": source.merge_stats
+    }
+
+FORMAT_PATTERN = "^(rows|columns)$"
+
+def columns_response(df: pd.DataFrame, **meta) -> Response:
+    """format=columns: typed column arrays serialized straight from the frame"""
+    return Response(DataTransformer.to_columns(df, **meta), media_type="application/json")
+
 @router.get("/{id}/preview")
-async def preview(id: int, rows: int = Query(100, ge=1, le=500), db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    result = await db.execute(select(DataSource).where(DataSource.id == id, DataSource.user_id == user.id))
-    source = result.scalar_one_or_none()
-    if not source:
-        raise HTTPException(404, "Not found")
+async def preview(
+    id: int, rows: int = Query(100, ge=1, le=500), format: str = Query("rows", regex=FORMAT_PATTERN),
+    db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    source = await get_user_source(db, id, user)
     if not os.path.exists(source.file_path):
         raise HTTPException(404, "File not found on server")
-    df = FileParser.parse(source.file_path)
-    preview_df = df.head(rows).fillna("")
-    return {"columns": source.columns_meta, "data": preview_df.to_dict(orient="records"), "total_rows": source.row_count, "preview_rows": min(rows, source.row_count or 0)}
+    store = await get_source_store(source.id, source.file_path, build=False, **workbook_options(source))
+    if store is not None:
+        preview_df = store.take(None, 0, rows)
+    else:
+        preview_df = FileParser.parse(source.file_path, nrows=rows, **workbook_options(source))
+    meta = {"columns": source.columns_meta, "total_rows": source.row_count, "preview_rows": min(rows, source.row_count or 0)}
+    if format == "columns":
+        return columns_response(preview_df, **meta)
+    return {**meta, "data": preview_df.fillna("").to_dict(orient="records")}
 
-@router.get("/{id}/data")
+@router.get("/{id}/data", dependencies=[Depends(rate_limit("datasource-data", settings.DATASOURCE_RATE_LIMIT, per="user"))])
 async def get_data(
     id: int, page: int = Query(1, ge=1), page_size: int = Query(50, ge=1, le=500),
     sort_by: str = Query(None), sort_order: str = Query("asc"), search: str = Query(None),
+    format: str = Query("rows", regex=FORMAT_PATTERN),
     db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
 ):
-    result = await db.execute(select(DataSource).where(DataSource.id == id, DataSource.user_id == user.id))
-    source = result.scalar_one_or_none()
-    if not source:
-        raise HTTPException(404, "Not found")
+    source = await get_user_source(db, id, user)
     if not os.path.exists(source.file_path):
         raise HTTPException(404, "File not found")
     
-    df = FileParser.parse(source.file_path)
-    if search:
-        mask = df.astype(str).apply(lambda x: x.str.contains(search, case=False, na=False)).any(axis=1)
-        df = df[mask]
+    store = await get_source_store(source.id, source.file_path, **workbook_options(source))
     
-    total = len(df)
-    if sort_by and sort_by in df.columns:
-        df = df.sort_values(by=sort_by, ascending=(sort_order == "asc"))
+    def read_page():
+        # The first search or sort of a column builds its index; keep that off the event loop
+        rows = store.search(search) if search else None
+        total = store.num_rows if rows is None else len(rows)
+        if sort_by and sort_by in store.columns:
+            rows = store.sorted_rows(sort_by, ascending=(sort_order == "asc"), rows=rows)
+        return total, store.take(rows, (page - 1) * page_size, page_size)
     
-    start = (page - 1) * page_size
-    page_df = df.iloc[start:start + page_size].fillna("")
+    total, page_df = await asyncio.to_thread(read_page)
     
-    return {"columns": source.columns_meta, "data": page_df.to_dict(orient="records"), "total": total, "page": page, "page_size": page_size, "total_pages": (total + page_size - 1) // page_size}
+    meta = {"columns": source.columns_meta, "total": total, "page": page, "page_size": page_size, "total_pages": (total + page_size - 1) // page_size}
+    if format == "columns":
+        return columns_response(page_df, **meta)
+    return {**meta, "data": page_df.fillna("").to_dict(orient="records")}
+
+AGGREGATE_CACHE_TTL = 3600  # Stores never change after ingestion; entries go when the source is deleted
+
+@router.get("/{id}/aggregate", dependencies=[Depends(rate_limit("datasource-aggregate", settings.DATASOURCE_RATE_LIMIT, per="user"))])
+async def aggregate(
+    id: int, x: str = Query(...), y: str = Query(None),
+    agg: str = Query("count", regex="^(count|sum|mean|min|max|median)$"), group_by: str = Query(None),
+    db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    """Chart data (DataTransformer.to_chart_data) over a source's columnar store"""
+    source = await get_user_source(db, id, user)
+    spec = {"x": x, "y": y, "agg": agg, "group_by": group_by}
+    cache_key = f"datasource:{id}:agg:{hashlib.md5(json.dumps(spec, sort_keys=True).encode()).hexdigest()}"
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    if not os.path.exists(source.file_path):
+        raise HTTPException(404, "File not found")
+    store = await get_source_store(source.id, source.file_path, **workbook_options(source))
+    unknown = [c for c in (x, y, group_by) if c and c not in store.columns]
+    if unknown:
+        raise HTTPException(400, f"Unknown columns: {unknown}")
+    if agg != "count" and not y:
+        # Same default as to_chart_data, chosen from the full schema
+        numeric = [f.name for f in store.table.schema if pa.types.is_integer(f.type) or pa.types.is_floating(f.type)]
+        y = numeric[0] if numeric else store.columns[0]
+
+    # Only the referenced columns leave the memory-mapped table
+    columns = list(dict.fromkeys(c for c in (x, y if agg != "count" else None, group_by) if c))
+    def chart_data():
+        df = store.table.select(columns).to_pandas()
+        return DataTransformer.to_chart_data(df, x, y, agg, group_by)
+    try:
+        data = await asyncio.to_thread(chart_data)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(400, f"Cannot aggregate {y!r} with {agg}: {e}")
+
+    result = {"x": x, "y": y, "agg": agg, "group_by": group_by, "data": clean_for_json(data)}
+    await cache_set(cache_key, result, ttl=AGGREGATE_CACHE_TTL)
+    return result
 
 @router.get("/{id}/validate")
 async def validate_source(id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    result = await db.execute(select(DataSource).where(DataSource.id == id, DataSource.user_id == user.id))
-    source = result.scalar_one_or_none()
-    if not source:
-        raise HTTPException(404, "Not found")
+    source = await get_user_source(db, id, user)
+    if source.validation is not None:
+        return source.validation
     if not os.path.exists(source.file_path):
         raise HTTPException(404, "File not found")
-    df = FileParser.parse(source.file_path)
-    return DataValidator.validate(df)
+    # Sources ingested before validation was stored
+    df = FileParser.parse(source.file_path, **workbook_options(source))
+    source.validation = DataValidator.validate(df)
+    await db.commit()
+    return source.validation
 
 @router.get("/{id}/schema")
 async def detect_schema(id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    result = await db.execute(select(DataSource).where(DataSource.id == id, DataSource.user_id == user.id))
-    source = result.scalar_one_or_none()
-    if not source:
-        raise HTTPException(404, "Not found")
+    source = await get_user_source(db, id, user)
     if not os.path.exists(source.file_path):
         raise HTTPException(404, "File not found")
-    df = FileParser.parse(source.file_path)
+    df = FileParser.parse(source.file_path, **workbook_options(source))
     return {"schema": SchemaDetector.detect_schema(df)}
 
 @router.post("/{id}/process")
 async def process_source(id: int, name: str = Query(None), db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    result = await db.execute(select(DataSource).where(DataSource.id == id, DataSource.user_id == user.id))
-    source = result.scalar_one_or_none()
-    if not source:
-        raise HTTPException(404, "Not found")
+    source = await get_user_source(db, id, user)
     if name:
         source.name = name
     source.status = "ready"
@@ -330,31 +584,36 @@ async def process_source(id: int, name: str = Query(None), db: AsyncSession = De
     return {"id": source.id, "name": source.name, "columns": source.columns_meta, "row_count": source.row_count, "status": source.status, "created_at": source.created_at.isoformat() if source.created_at else None}
 
 @router.delete("/{id}")
-async def delete_source(id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    result = await db.execute(select(DataSource).where(DataSource.id == id, DataSource.user_id == user.id))
-    source = result.scalar_one_or_none()
-    if not source:
-        raise HTTPException(404, "Not found")
-    
-    data_type = source.data_type
-    file_path = source.file_path
-    
-    # Delete dashboard_data FIRST (foreign key constraint)
-    if data_type == "dashboard":
-        await db.execute(delete(DashboardData).where(DashboardData.source_id == id))
-    
-    # Then delete data_source
-    await db.delete(source)
+async def delete_source(
+    id: int, background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)
+):
+    source = await get_user_source(db, id, user)
+
+    if source.data_type != "dashboard":
+        file_path = source.file_path
+        await db.delete(source)
+        await db.commit()
+        drop_source_store(id)
+        await cache_delete(f"datasource:{id}:agg:*")
+        await remove_source_file(db, file_path)
+        return {"ok": True}
+
+    # Soft delete: the rows drop out of dashboard queries now and are
+    # purged (with the source and its file) in the background
+    months = await get_source_months(db, id)
+    months_before = await get_available_months(db)
+    source.deleted_at = func.now()
     await db.commit()
-    
-    # Delete file after DB commit
-    if file_path and os.path.exists(file_path):
-        os.remove(file_path)
+    background_tasks.add_task(purge_source_task, id)
+    drop_source_store(id)
+    await cache_delete(f"datasource:{id}:agg:*")
 
-    # Clear dashboard cache
+    # Only invalidate cached dashboards for the months this source touched
     try:
-        await cache_delete("dashboard:*")
-    except:
-        pass
+        await invalidate_dashboard_months(db, months, months_before)
+        await bump_data_generation()
+    except Exception as cache_err:
+        logger.warning(f"Failed to clear cache: {cache_err}")
     
     return {"ok": True}
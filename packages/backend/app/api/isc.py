@@ -1,30 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-import pandas as pd
-import os
-from app.core.config import settings
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import asyncio
+import numpy as np
+from app.services import isc_store
 
 router = APIRouter()
 
-# Cache for ISC data
-_isc_cache = {"df": None, "mtime": 0}
-MASTER_ISC_PATH = os.path.join(settings.UPLOAD_DIR, "master_isc.csv")
 
-
-def get_isc_data() -> pd.DataFrame:
-    """Load ISC data from master CSV with caching"""
-    if not os.path.exists(MASTER_ISC_PATH):
+def get_isc_store() -> isc_store.IscStore:
+    """Live ISC version; loaded and swapped in the background by isc_store.run_isc_refresher"""
+    store = isc_store.current_store()
+    if store is None:
+        if not isc_store.ready.is_set():
+            raise HTTPException(503, "ISC data is loading")
         raise HTTPException(404, "No ISC data uploaded yet")
-    
-    mtime = os.path.getmtime(MASTER_ISC_PATH)
-    if _isc_cache["df"] is None or _isc_cache["mtime"] != mtime:
-        df = pd.read_csv(MASTER_ISC_PATH, dtype={"Item code": str})
-        # Create lookup dict for O(1) access
-        df["_item_upper"] = df["Item code"].str.strip().str.upper()
-        _isc_cache["df"] = df
-        _isc_cache["mtime"] = mtime
-    
-    return _isc_cache["df"]
+    return store
+
+
+def get_isc_lookup() -> dict:
+    return get_isc_store().lookup
 
 
 class IscCheckRequest(BaseModel):
@@ -44,20 +39,15 @@ class IscCheckResponse(BaseModel):
 @router.post("/check", response_model=IscCheckResponse)
 async def check_item(data: IscCheckRequest):
     """Check if requested quantity is valid based on ISC data"""
-    df = get_isc_data()
+    lookup = get_isc_lookup()
     
     item_upper = data.item_code.strip().upper()
-    item_rows = df[df["_item_upper"] == item_upper]
-    
-    if item_rows.empty:
+    if item_upper not in lookup:
         raise HTTPException(404, f"Item code '{data.item_code}' not found")
     
-    # Get first non-NaN Avg Consume value
-    avg_values = item_rows["Avg Consume"].dropna()
-    if avg_values.empty:
+    avg_consume = lookup[item_upper]
+    if avg_consume is None:
         raise HTTPException(400, f"Avg Consume value is missing for item '{data.item_code}'")
-    
-    avg_consume = abs(float(avg_values.iloc[0]))
     threshold = 2 * avg_consume
     total = data.pick_to_light_stock + data.requested_quantity
     result = "Yes" if total <= threshold else "No"
@@ -69,3 +59,96 @@ async def check_item(data: IscCheckRequest):
         total=total,
         result=result
     )
+
+
+MAX_BATCH_ITEMS = 5000
+
+
+class IscBatchCheckRequest(BaseModel):
+    items: List[IscCheckRequest] = Field(..., max_length=MAX_BATCH_ITEMS)
+
+
+class IscBatchCheckResult(BaseModel):
+    item_code: str
+    avg_consume: Optional[float] = None
+    threshold: Optional[float] = None
+    total: float
+    result: Optional[str] = None  # Yes | No, None when error is set
+    error: Optional[str] = None
+
+
+class IscBatchCheckResponse(BaseModel):
+    results: List[IscBatchCheckResult]
+    yes: int
+    no: int
+    errors: int
+
+
+@router.post("/check/batch", response_model=IscBatchCheckResponse)
+async def check_items(data: IscBatchCheckRequest):
+    """Apply the /check rule to a whole pick list; unknown items get an error instead of failing the batch"""
+    lookup = get_isc_lookup()
+    
+    codes = [item.item_code.strip().upper() for item in data.items]
+    known = np.array([code in lookup for code in codes], dtype=bool)
+    avg = np.array([lookup.get(code) for code in codes], dtype=float)  # None -> NaN
+    stock = np.array([item.pick_to_light_stock for item in data.items], dtype=float)
+    requested = np.array([item.requested_quantity for item in data.items], dtype=float)
+    
+    threshold = 2 * avg
+    total = stock + requested
+    passed = total <= threshold
+    valid = known & ~np.isnan(avg)
+    
+    results = []
+    for i, item in enumerate(data.items):
+        if not known[i]:
+            results.append(IscBatchCheckResult(item_code=item.item_code, total=total[i], error="Item code not found"))
+        elif not valid[i]:
+            results.append(IscBatchCheckResult(item_code=item.item_code, total=total[i], error="Avg Consume value is missing"))
+        else:
+            results.append(IscBatchCheckResult(
+                item_code=item.item_code, avg_consume=avg[i], threshold=threshold[i], total=total[i],
+                result="Yes" if passed[i] else "No"
+            ))
+    
+    yes = int((passed & valid).sum())
+    return IscBatchCheckResponse(results=results, yes=yes, no=int(valid.sum()) - yes, errors=int((~valid).sum()))
+
+
+class IscSearchMatch(BaseModel):
+    item_code: str
+    avg_consume: Optional[float] = None
+    distance: int
+
+
+class IscSearchResponse(BaseModel):
+    query: str
+    mode: str
+    version: str
+    items: List[IscSearchMatch]
+
+
+@router.get("/search", response_model=IscSearchResponse)
+async def search_items(
+    q: str = Query(..., min_length=1, max_length=100),
+    mode: str = Query("prefix", regex="^(prefix|fuzzy)$"),
+    max_distance: int = Query(1, ge=0, le=2),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Item codes starting with q (prefix) or within max_distance edits of it (fuzzy)"""
+    store = get_isc_store()
+    
+    query = q.strip().upper()
+    if mode == "prefix":
+        matches = [(0, code) for code in store.search_index.prefix(query, limit)]
+    else:
+        # Tens of ms on large catalogs at max_distance=2; keep /check traffic flowing meanwhile
+        matches = await asyncio.to_thread(store.search_index.fuzzy, query, max_distance, limit)
+    
+    return IscSearchResponse(
+        query=q,
+        mode=mode,
+        version=store.version,
+        items=[IscSearchMatch(item_code=code, avg_consume=store.lookup[code], distance=d) for d, code in matches]
+    )
@@ -7,6 +7,10 @@ logger = logging.getLogger(__name__)
 
 _redis: redis.Redis | None = None
 
+# Bumped whenever dashboard_data changes; kept outside the "dashboard:*" namespace
+# so cache invalidation does not reset it
+DATA_GENERATION_KEY = "data:generation"
+
 async def get_redis() -> redis.Redis:
     global _redis
     if _redis is None:
@@ -45,3 +49,41 @@ async def cache_delete(pattern: str):
     except redis.RedisError as e:
         logger.warning(f"Redis cache delete failed for pattern '{pattern}': {e}")
 
+async def get_data_generation() -> int | None:
+    """Current dashboard data generation, or None if Redis is unavailable"""
+    try:
+        r = await get_redis()
+        return int(await r.get(DATA_GENERATION_KEY) or 0)
+    except redis.RedisError as e:
+        logger.warning(f"Redis get data generation failed: {e}")
+        return None
+
+async def bump_data_generation():
+    try:
+        r = await get_redis()
+        await r.incr(DATA_GENERATION_KEY)
+    except redis.RedisError as e:
+        logger.warning(f"Redis bump data generation failed: {e}")
+
+async def set_version(key: str, channel: str, version: str):
+    """Store a version and announce it to subscribers of channel"""
+    try:
+        r = await get_redis()
+        await r.set(key, version)
+        await r.publish(channel, version)
+    except redis.RedisError as e:
+        logger.warning(f"Redis set version failed for key '{key}': {e}")
+
+async def publish(channel: str, message: str):
+    try:
+        r = await get_redis()
+        await r.publish(channel, message)
+    except redis.RedisError as e:
+        logger.warning(f"Redis publish failed for channel '{channel}': {e}")
+
+async def subscribe(channel: str):
+    """PubSub subscribed to channel; the caller closes it"""
+    r = await get_redis()
+    pubsub = r.pubsub()
+    await pubsub.subscribe(channel)
+    return pubsub
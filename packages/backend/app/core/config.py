@@ -10,6 +10,23 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
     REDIS_URL: str = "redis://localhost:6379"
     ENVIRONMENT: str = "development"  # development, staging, production
+    DASHBOARD_ENGINE: str = "sql"  # sql | memory (per-worker in-memory snapshot)
+    PURGE_BATCH_SIZE: int = 5000  # Rows deleted per transaction when purging a source
+    PURGE_BATCH_DELAY: float = 0.2  # Seconds to pause between purge batches
+    MERGE_KEY_COLUMNS: str = "production_order_no,reporting_day"  # Natural key for merge uploads
+    SOURCE_STORE_CACHE_SIZE: int = 4  # Source stores (data browser indexes) kept in memory per worker
+    EXCEL_ENGINE: str = "auto"  # auto | calamine | openpyxl
+    EXCEL_PARSE_WORKERS: int = 4  # Processes used to parse the sheets of a multi-sheet workbook
+    ISC_REFRESH_INTERVAL: float = 30  # Seconds between ISC version polls when no update is published
+    USER_CACHE_TTL: int = 30  # Seconds an authenticated user is served from cache; 0 disables the cache
+    USER_CACHE_REDIS: bool = False  # Also share cached users between workers through Redis
+    BCRYPT_ROUNDS: int = 12  # bcrypt cost for new hashes; older hashes are upgraded at login
+    PASSWORD_HASH_WORKERS: int = 2  # Threads per worker running bcrypt
+    PASSWORD_HASH_QUEUE: int = 32  # bcrypt calls allowed to wait for a thread before logins get 503
+    CONFIG_CACHE_TTL: int = 300  # Seconds an AppConfig value is served from cache; 0 disables the cache
+    LOGIN_RATE_LIMIT: str = "5/minute"  # Login attempts per client IP, shared by all workers (per worker without Redis)
+    DATASOURCE_RATE_LIMIT: str = "120/minute"  # Data browser / chart requests per user
+    EXPORT_RATE_LIMIT: str = "10/minute"  # Bulk dashboard exports per user
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,164 @@
+"""
+Rate limiting shared by all workers through Redis.
+
+Each limit is a sliding window kept as a sorted set of request timestamps
+under ratelimit:<scope>:<window seconds>:<client>. One Lua script trims every
+window a request falls under, checks them and, only if all have room, records
+the request, so a request costs a single EVALSHA round trip however many
+limits apply.
+
+Limits are attached to routes as dependencies:
+
+    @router.post("/login", dependencies=[Depends(rate_limit("login", "5/minute"))])
+
+and are counted per client IP, or per user id from the session token
+(per="user"; requests without a valid token fall back to their IP). A limit
+can be given as "<count>/<second|minute|hour|day>".
+
+Timestamps come from Redis (TIME inside the script), so workers whose clocks
+disagree still share one window. When Redis is unavailable, requests are let
+through, unless the route asks for fallback="local": its limits are then
+enforced by each process on its own, which is looser than the shared limit
+(one window per worker) but never unlimited.
+"""
+import logging
+import math
+import time
+import uuid
+from collections import deque
+
+import redis.asyncio as redis
+from fastapi import HTTPException, Request
+from jose import JWTError
+
+from app.core.cache import get_redis
+from app.core.security import decode_token
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# KEYS: one window per limit; ARGV: member, then (window_ms, limit) per key.
+# Returns 0 when the request was recorded, else ms until the fullest window has room.
+SLIDING_WINDOW = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[2 * i])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= tonumber(ARGV[2 * i + 1]) then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        wait = math.max(wait, tonumber(oldest[2]) + window - now)
+    end
+end
+if wait > 0 then
+    return wait
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[1])
+    redis.call('PEXPIRE', key, ARGV[2 * i])
+end
+return 0
+"""
+# Windows kept per process for fallback="local" while Redis is unavailable
+LOCAL_MAX_KEYS = 10000
+
+_script = None
+# key -> monotonic times of the requests in its window, oldest first
+_local_windows: dict[str, deque] = {}
+
+
+def parse_limit(limit: str) -> tuple[int, int]:
+    """"5/minute" -> (5, 60)"""
+    count, _, period = limit.partition("/")
+    try:
+        parsed = int(count), PERIODS[period.strip().lower()]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit '{limit}', expected <count>/<{'|'.join(PERIODS)}>")
+    # The script needs a recorded request to compute a wait; a limit of 0 would fail open
+    if parsed[0] < 1:
+        raise ValueError(f"Invalid rate limit '{limit}', count must be at least 1")
+    return parsed
+
+
+def client_key(request: Request, per: str) -> str:
+    if per == "user":
+        token = request.cookies.get("auth_token")
+        if token:
+            try:
+                user_id = decode_token(token).get("sub")
+                if user_id:
+                    return f"user:{user_id}"
+            except JWTError:
+                pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def hit(limits: list[tuple[str, int, int]]) -> float:
+    """Record one request against (key, count, seconds) windows.
+
+    Returns 0 if it was allowed, else seconds until it would be.
+    """
+    global _script
+    r = await get_redis()
+    if _script is None:
+        _script = r.register_script(SLIDING_WINDOW)
+    args = [uuid.uuid4().hex]
+    for _, count, seconds in limits:
+        args += [seconds * 1000, count]
+    wait_ms = await _script(keys=[key for key, _, _ in limits], args=args)
+    return int(wait_ms) / 1000
+
+
+def local_hit(limits: list[tuple[str, int, int]]) -> float:
+    """hit() against this process's own windows, for when Redis is unavailable"""
+    now = time.monotonic()
+    wait = 0.0
+    for key, count, seconds in limits:
+        window = _local_windows.get(key)
+        if window is None:
+            continue
+        while window and window[0] <= now - seconds:
+            window.popleft()
+        if len(window) >= count:
+            wait = max(wait, window[0] + seconds - now)
+    if wait > 0:
+        return wait
+    for key, _, _ in limits:
+        _local_windows.setdefault(key, deque()).append(now)
+    while len(_local_windows) > LOCAL_MAX_KEYS:
+        # Drop the longest-known keys; their windows have most likely expired
+        del _local_windows[next(iter(_local_windows))]
+    return 0
+
+
+def rate_limit(scope: str, *limits: str, per: str = "ip", fallback: str = "allow"):
+    """Dependency allowing at most each of limits per client (per="ip" | "user") on scope.
+
+    fallback is what happens while Redis is unavailable: "allow" lets requests
+    through, "local" enforces the limits in this process only.
+    """
+    parsed = [parse_limit(limit) for limit in limits]
+    if fallback not in ("allow", "local"):
+        raise ValueError(f"Invalid rate limit fallback '{fallback}', expected allow or local")
+
+    async def dependency(request: Request):
+        client = client_key(request, per)
+        windows = [(f"ratelimit:{scope}:{seconds}:{client}", count, seconds) for count, seconds in parsed]
+        try:
+            wait = await hit(windows)
+        except redis.RedisError as e:
+            if fallback == "allow":
+                logger.warning(f"Rate limit check failed for '{scope}', allowing request: {e}")
+                return
+            logger.warning(f"Rate limit check failed for '{scope}', limiting in this process: {e}")
+            wait = local_hit(windows)
+        if wait > 0:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Rate limit exceeded: {', '.join(limits)}",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    return dependency
@@ -1,14 +1,93 @@
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from jose import jwt
+import asyncio
 import bcrypt
+import threading
+import time
 from app.core.config import settings
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(settings.BCRYPT_ROUNDS)).decode()
 
 def verify_password(plain: str, hashed: str) -> bool:
     return bcrypt.checkpw(plain.encode(), hashed.encode())
 
+def needs_rehash(hashed: str) -> bool:
+    """True when hashed was made with a cost other than BCRYPT_ROUNDS ($2b$<cost>$...)"""
+    try:
+        return int(hashed.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+# bcrypt takes 100+ ms per call; it runs on its own threads so logins never block the event loop.
+# At most PASSWORD_HASH_WORKERS calls run and PASSWORD_HASH_QUEUE wait; further calls are rejected.
+class PasswordHashBusy(Exception):
+    pass
+
+_hash_pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_counter_lock = threading.Lock()
+_in_flight = 0  # Submitted and not yet finished (or cancelled while queued) on the pool
+_rejected = 0
+_calls = 0
+_waits = deque(maxlen=1000)  # seconds between submit and start, most recent calls
+_runs = deque(maxlen=1000)
+
+def _timed(fn, submitted: float, *args):
+    started = time.perf_counter()
+    _waits.append(started - submitted)
+    try:
+        return fn(*args)
+    finally:
+        _runs.append(time.perf_counter() - started)
+
+def _release(_future):
+    global _in_flight
+    with _counter_lock:
+        _in_flight -= 1
+
+async def _offload(fn, *args):
+    global _in_flight, _rejected, _calls
+    with _counter_lock:
+        if _in_flight >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE:
+            _rejected += 1
+            raise PasswordHashBusy()
+        _in_flight += 1
+        _calls += 1
+    try:
+        future = _hash_pool.submit(_timed, fn, time.perf_counter(), *args)
+    except BaseException:
+        _release(None)
+        raise
+    # Released when the work itself ends, not when the awaiting request is cancelled
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+async def hash_password_async(password: str) -> str:
+    return await _offload(hash_password, password)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _offload(verify_password, plain, hashed)
+
+def password_hash_stats() -> dict:
+    """Pool load and queue wait / run time percentiles over the last 1000 calls, in ms"""
+    def ms(samples, q):
+        return round(samples[min(len(samples) - 1, int(len(samples) * q / 100))] * 1000, 1) if samples else None
+    waits, runs = sorted(_waits), sorted(_runs)
+    return {
+        "workers": settings.PASSWORD_HASH_WORKERS,
+        "queue_limit": settings.PASSWORD_HASH_QUEUE,
+        "in_flight": _in_flight,
+        "calls": _calls,
+        "rejected": _rejected,
+        "wait_ms_p50": ms(waits, 50),
+        "wait_ms_p99": ms(waits, 99),
+        "wait_ms_max": round(waits[-1] * 1000, 1) if waits else None,
+        "run_ms_p50": ms(runs, 50),
+    }
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -0,0 +1,105 @@
+"""
+Short-lived cache of authenticated users for get_current_user.
+
+Entries are keyed by user id and a hash of the session token. They hold the
+user's public columns, never the password hash, and expire after
+USER_CACHE_TTL seconds. With USER_CACHE_REDIS they are also shared between
+workers through Redis, so a user is loaded once per TTL rather than once per
+worker.
+
+invalidate_user drops a user's entries everywhere. It clears this process,
+deletes the Redis keys and announces the id on auth:users, and every worker's
+run_user_cache_listener drops its own copy. Call it whenever a user's role or
+password changes or the user is deleted. If Redis is unavailable, other
+workers can serve a stale entry until it expires.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Optional
+
+from app.core.cache import cache_delete, cache_get, cache_set, publish, subscribe
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+USER_CHANNEL = "auth:users"
+USER_FIELDS = ("id", "email", "full_name", "role", "is_active")
+
+# user id -> token hash -> (monotonic expiry, user fields)
+_entries: dict[int, dict[str, tuple[float, dict]]] = {}
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+def _redis_key(user_id: int, token_hash: str) -> str:
+    return f"auth:user:{user_id}:{token_hash}"
+
+
+def _remember(user_id: int, token_hash: str, fields: dict):
+    now = time.monotonic()
+    tokens = _entries.setdefault(user_id, {})
+    for stale in [t for t, (expires, _) in tokens.items() if expires <= now]:
+        del tokens[stale]
+    tokens[token_hash] = (now + settings.USER_CACHE_TTL, fields)
+
+
+async def get_cached_user(user_id: int, token: str) -> Optional[dict]:
+    """Cached fields of the user behind token, or None on a miss"""
+    if settings.USER_CACHE_TTL <= 0:
+        return None
+    token_hash = _token_hash(token)
+    entry = _entries.get(user_id, {}).get(token_hash)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    if settings.USER_CACHE_REDIS:
+        fields = await cache_get(_redis_key(user_id, token_hash))
+        if fields:
+            _remember(user_id, token_hash, fields)
+            return fields
+    return None
+
+
+async def cache_user(user, token: str):
+    if settings.USER_CACHE_TTL <= 0:
+        return
+    token_hash = _token_hash(token)
+    fields = {field: getattr(user, field) for field in USER_FIELDS}
+    _remember(user.id, token_hash, fields)
+    if settings.USER_CACHE_REDIS:
+        await cache_set(_redis_key(user.id, token_hash), fields, ttl=settings.USER_CACHE_TTL)
+
+
+async def invalidate_user(user_id: int):
+    """Drop every cached session of user_id in all workers"""
+    _entries.pop(user_id, None)
+    if settings.USER_CACHE_REDIS:
+        await cache_delete(f"auth:user:{user_id}:*")
+    await publish(USER_CHANNEL, str(user_id))
+
+
+async def run_user_cache_listener():
+    """Per-worker background task: apply invalidations published by other processes"""
+    while True:
+        pubsub = None
+        try:
+            pubsub = await subscribe(USER_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _entries.pop(int(message["data"]), None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"User cache invalidation subscription failed: {e}")
+            # Invalidations may have been missed while disconnected
+            _entries.clear()
+            await asyncio.sleep(settings.USER_CACHE_TTL)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
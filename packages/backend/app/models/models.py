@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, Date
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Text, JSON, Date, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -27,6 +27,12 @@ class DataSource(Base):
     status = Column(String(20), default="pending")
     error_message = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
+    deleted_at = Column(DateTime)  # Soft delete; rows are purged in the background
+    merge_stats = Column(JSON)  # Counts from merge ingestion (inserted/updated/unchanged)
+    validation = Column(JSON)  # DataValidator result from ingestion, incl. cross-source duplicates
+    sheet_name = Column(String(255))  # Workbook sheet when uploaded with sheets=separate
+    sheet_mode = Column(String(20))  # sheets= of a workbook upload: first | combine | separate
+    ingest_metrics = Column(JSON)  # IngestTelemetry summary: per-stage seconds, rows/sec, peak RSS
 
 class AppConfig(Base):
     """Store app-wide configurations like dashboard layout"""
@@ -38,10 +44,16 @@ class AppConfig(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 class DashboardData(Base):
+    """Range-partitioned by reporting_day month, see migrations/002_partition_dashboard_data.sql"""
     __tablename__ = "dashboard_data"
-    id = Column(Integer, primary_key=True)
+    __table_args__ = (
+        Index("ix_dashboard_data_order_day", "production_order_no", "reporting_day"),  # Merge key
+        {"postgresql_partition_by": "RANGE (reporting_day)"},
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
     source_id = Column(Integer, ForeignKey("data_sources.id"), index=True)
-    reporting_day = Column(Date, index=True)
+    reporting_day = Column(Date, primary_key=True, index=True)  # Partition key
+    production_order_no = Column(String(100))
     customer = Column(String(255), index=True)
     category = Column(String(255), index=True)
     product = Column(String(255), index=True)
@@ -50,4 +62,15 @@ class DashboardData(Base):
     production_no = Column(Integer)  # Use 0 if missing
     root_cause = Column(String(500))
     improvement_plan = Column(Text)
+    row_hash = Column(BigInteger, index=True)  # DataValidator.row_hashes fingerprint of the ingested columns
+    created_at = Column(DateTime, server_default=func.now())
+
+class DashboardDataChange(Base):
+    """Rows inserted or updated by merge ingestion, for incremental refresh"""
+    __tablename__ = "dashboard_data_changes"
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, ForeignKey("data_sources.id", ondelete="CASCADE"), index=True)
+    row_id = Column(Integer, nullable=False)
+    reporting_day = Column(Date, nullable=False)
+    change = Column(String(10), nullable=False)  # insert | update
     created_at = Column(DateTime, server_default=func.now())
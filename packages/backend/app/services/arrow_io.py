@@ -0,0 +1,53 @@
+"""
+Memory-mapped Arrow IPC and numpy files shared by all workers.
+
+Files are written once (to a temp name, then renamed into place) and mapped
+read-only afterwards, so every uvicorn worker reads the same page-cache copy
+instead of holding a private heap copy of the parsed data.
+"""
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+def _tmp_path(path: str) -> str:
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+
+def frame_to_arrow(df: pd.DataFrame) -> pa.Table:
+    """Convert a parsed frame; columns Arrow cannot type (mixed values) are stored as text"""
+    arrays = []
+    for col in df.columns:
+        series = df[col]
+        try:
+            arrays.append(pa.array(series, from_pandas=True))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(pa.array(series.astype(str).where(series.notna()), from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+
+
+def write_arrow(table: pa.Table, path: str):
+    """Write an uncompressed IPC file (compression would defeat zero-copy reads)"""
+    tmp = _tmp_path(path)
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def map_arrow(path: str) -> pa.Table:
+    """Map an IPC file read-only; column buffers point into the mapping"""
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def save_array(arr: np.ndarray, path: str):
+    tmp = _tmp_path(path)
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def map_array(path: str) -> np.ndarray:
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,108 @@
+"""
+Per-worker cache of AppConfig values.
+
+Config is read on every page load and changes rarely. Each value is cached
+with an ETag (a hash of its JSON), and keys with no row are cached as None.
+update_config calls invalidate_config, which drops the key in this worker and
+announces it on config:updates so run_config_cache_listener drops it
+everywhere else.
+
+Entries also expire after CONFIG_CACHE_TTL seconds, which bounds staleness
+while Redis is unavailable. A load that overlaps an invalidation is not
+cached, so a value read just before an update cannot outlive it. The endpoint
+is public, so the cache is an LRU of at most MAX_ENTRIES keys; requests for
+made-up keys cannot grow it.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import publish, subscribe
+from app.core.config import settings
+from app.models.models import AppConfig
+
+logger = logging.getLogger(__name__)
+
+CONFIG_CHANNEL = "config:updates"
+MAX_ENTRIES = 1000
+
+# key -> (monotonic expiry, value, etag), least recently used first
+_entries: "OrderedDict[str, tuple[float, object, str]]" = OrderedDict()
+# Bumped on every invalidation, so loads that overlap one are not cached
+_generation = 0
+
+
+def value_etag(value) -> str:
+    digest = hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+async def get_configs(db: AsyncSession, keys: list[str]) -> dict[str, tuple[object, str]]:
+    """key -> (value, etag) for keys; a key without a row has value None"""
+    now = time.monotonic()
+    found, missing = {}, []
+    for key in keys:
+        entry = _entries.get(key)
+        if entry and entry[0] > now:
+            _entries.move_to_end(key)
+            found[key] = entry[1:]
+        else:
+            missing.append(key)
+    if not missing:
+        return found
+
+    generation = _generation
+    result = await db.execute(select(AppConfig.key, AppConfig.value).where(AppConfig.key.in_(missing)))
+    values = dict(result.all())
+    expires = time.monotonic() + settings.CONFIG_CACHE_TTL
+    for key in missing:
+        value = values.get(key)
+        found[key] = (value, value_etag(value))
+        if generation == _generation:
+            _entries[key] = (expires, *found[key])
+            _entries.move_to_end(key)
+    while len(_entries) > MAX_ENTRIES:
+        _entries.popitem(last=False)
+    return found
+
+
+def _drop(key: str):
+    global _generation
+    _generation += 1
+    _entries.pop(key, None)
+
+
+async def invalidate_config(key: str):
+    """Drop key from every worker's cache"""
+    _drop(key)
+    await publish(CONFIG_CHANNEL, key)
+
+
+async def run_config_cache_listener():
+    """Per-worker background task: apply invalidations published by other workers"""
+    while True:
+        pubsub = None
+        try:
+            pubsub = await subscribe(CONFIG_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _drop(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Config cache invalidation subscription failed: {e}")
+            # Invalidations may have been missed while disconnected
+            _entries.clear()
+            await asyncio.sleep(min(settings.CONFIG_CACHE_TTL, 30))
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
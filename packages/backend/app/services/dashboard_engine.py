@@ -0,0 +1,148 @@
+"""
+In-process columnar snapshot of dashboard_data.
+
+Each worker keeps one pandas copy of the dashboard columns, with low-cardinality
+strings stored as categoricals, and answers the dashboard aggregates from it
+instead of issuing a query per chart. The snapshot is reloaded when the data
+generation in Redis changes (bumped on every upload and delete).
+"""
+import asyncio
+import logging
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_data_generation
+from app.models.models import DashboardData
+from app.services.source_purge import live_rows
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_COLUMNS = [
+    "reporting_day", "customer", "category", "product", "status",
+    "current_status", "production_no", "root_cause", "improvement_plan",
+]
+CATEGORICAL_COLUMNS = ["customer", "category", "product", "status", "current_status", "root_cause"]
+LOAD_BATCH_SIZE = 50000
+
+
+def _key(value):
+    """Turn pandas missing markers back into None like the SQL path returns"""
+    return None if pd.isna(value) else value
+
+
+class DashboardSnapshot:
+    """Dashboard aggregates over an in-memory frame (see SqlDashboardQueries)"""
+
+    def __init__(self, df: pd.DataFrame, generation: int):
+        self.generation = generation
+        days = pd.to_datetime(df["reporting_day"])
+        df["month"] = days.dt.strftime("%Y-%m").astype("category")
+        df["day"] = days.dt.strftime("%Y-%m-%d").astype("category")
+        df["production_no"] = pd.to_numeric(df["production_no"]).astype("float64")
+        for col in CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype("category")
+        self.df = df
+
+    @classmethod
+    async def load(cls, db: AsyncSession, generation: int) -> "DashboardSnapshot":
+        stmt = select(*[getattr(DashboardData, c) for c in SNAPSHOT_COLUMNS]).where(live_rows())
+        result = await db.stream(stmt.execution_options(yield_per=LOAD_BATCH_SIZE))
+        chunks = [pd.DataFrame(batch, columns=SNAPSHOT_COLUMNS) async for batch in result.partitions()]
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+        snapshot = await asyncio.to_thread(cls, df, generation)
+        logger.info(f"Loaded dashboard snapshot generation {generation}: {len(df)} rows")
+        return snapshot
+
+    def _filter(self, month=None, customers=None, categories=None, statuses=None, products=None) -> pd.DataFrame:
+        """Same semantics as app.api.dashboard.apply_filters"""
+        df = self.df
+        mask = np.ones(len(df), dtype=bool)
+        if month:
+            mask &= (df["month"] == month).to_numpy()
+        if customers:
+            mask &= df["customer"].isin([c.strip() for c in customers.split(',')]).to_numpy()
+        if categories:
+            cat_list = [c.strip() for c in categories.split(',')]
+            cat_mask = df["category"].isin(cat_list)
+            if 'Blank' in cat_list:
+                cat_mask |= df["category"].isna()
+            mask &= cat_mask.to_numpy()
+        if statuses:
+            mask &= df["status"].isin([s.strip() for s in statuses.split(',')]).to_numpy()
+        if products:
+            mask &= df["product"].isin([p.strip() for p in products.split(',')]).to_numpy()
+        return df if mask.all() else df[mask]
+
+    async def available_months(self) -> List[str]:
+        return sorted(self.df["month"].dropna().unique(), reverse=True)
+
+    async def metric_totals(self, filters: dict) -> dict:
+        df = self._filter(**filters)
+        prod = df["production_no"]
+        masks = {
+            "lock": (df["status"] == 'LOCK').to_numpy(),
+            "hold": (df["status"] == 'HOLD').to_numpy(),
+            "fail": (df["status"] == 'FAILURE').to_numpy(),
+            "cancel": (df["current_status"] == 'CANCELED').to_numpy(),
+        }
+        totals = {"total_prod": int(prod.sum()), "total_rows": len(df)}
+        for name, mask in masks.items():
+            totals[f"{name}_prod"] = int(prod[mask].sum())
+            totals[f"{name}_count"] = int(mask.sum())
+        return totals
+
+    async def row_count(self, filters: dict) -> int:
+        return len(self._filter(**filters))
+
+    async def value_counts(self, column, filters: dict, limit: Optional[int] = None) -> list:
+        counts = self._filter(**filters)[column.key].value_counts(dropna=False)
+        counts = counts[counts > 0]
+        if limit:
+            counts = counts.head(limit)
+        return [(_key(val), int(cnt)) for val, cnt in counts.items()]
+
+    async def trend_counts(self, filters: dict) -> list:
+        df = self._filter(**filters)
+        counts = df.groupby(["day", "status"], dropna=False, observed=True).size()
+        return [(_key(day), _key(status), int(cnt)) for (day, status), cnt in counts.items() if cnt]
+
+    async def root_cause_counts(self, filters: dict, limit: int = 20) -> list:
+        df = self._filter(**filters)
+        df = df[df["root_cause"].notna()]
+        grouped = df.groupby("root_cause", observed=True).agg(
+            cnt=("root_cause", "size"), imp_plan=("improvement_plan", "max")
+        )
+        grouped = grouped.sort_values("cnt", ascending=False, kind="stable").head(limit)
+        return [(rc, int(row.cnt), _key(row.imp_plan)) for rc, row in grouped.iterrows()]
+
+    async def distinct_values(self, column, month: Optional[str]) -> List[str]:
+        df = self.df
+        if month:
+            df = df[df["month"] == month]
+        return sorted(str(v) for v in df[column.key].dropna().unique())
+
+
+_snapshot: Optional[DashboardSnapshot] = None
+_snapshot_lock = asyncio.Lock()
+
+
+async def get_snapshot(db: AsyncSession) -> Optional[DashboardSnapshot]:
+    """Return this worker's snapshot, reloading it if the data generation moved.
+
+    Returns None when the generation cannot be read, since freshness can then
+    not be guaranteed and callers should query Postgres instead.
+    """
+    global _snapshot
+    generation = await get_data_generation()
+    if generation is None:
+        return None
+    if _snapshot is not None and _snapshot.generation == generation:
+        return _snapshot
+    async with _snapshot_lock:
+        if _snapshot is None or _snapshot.generation != generation:
+            _snapshot = await DashboardSnapshot.load(db, generation)
+    return _snapshot
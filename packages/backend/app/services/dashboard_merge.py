@@ -0,0 +1,134 @@
+"""
+Merge ingestion for dashboard_data.
+
+Re-uploading a month-to-date export in merge mode matches rows on a natural
+key (MERGE_KEY_COLUMNS) instead of appending a full copy: unseen keys are
+inserted, rows whose fingerprint (row_hash) differs are updated in place, and
+identical rows keep their values. Every matched row is taken over by the new
+source, so deleting an earlier upload never removes rows the new one also
+contains. Every inserted or updated row is logged in dashboard_data_changes.
+
+Merges are serialized with a transaction-level advisory lock, so two merges of
+the same export cannot both insert a key neither of them has seen.
+"""
+import logging
+from typing import AsyncIterable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MERGE_COLUMNS = [
+    "production_order_no", "reporting_day", "customer", "category", "product", "status",
+    "current_status", "production_no", "root_cause", "improvement_plan",
+]
+STAGE_CHUNK_SIZE = 1000
+# pg advisory lock namespace serializing merges across workers
+MERGE_LOCK_NAMESPACE = 29003
+
+
+def merge_key_columns() -> list[str]:
+    keys = [c.strip() for c in settings.MERGE_KEY_COLUMNS.split(",") if c.strip()]
+    unknown = [c for c in keys if c not in MERGE_COLUMNS]
+    if not keys or unknown:
+        raise ValueError(f"Invalid MERGE_KEY_COLUMNS: {settings.MERGE_KEY_COLUMNS!r}")
+    return keys
+
+
+async def merge_dashboard_rows(db: AsyncSession, source_id: int, chunks: AsyncIterable[list[dict]]) -> dict:
+    """Upsert chunks of records into dashboard_data by natural key within the session's transaction.
+
+    Chunks are staged as they arrive, so only one chunk of records is held in
+    memory. When a key repeats, the last record wins; records with a NULL key
+    part never match anything.
+
+    Returns counts of inserted/updated/unchanged rows, how many unchanged rows
+    were taken over from other sources, and the YYYY-MM months touched.
+    The merge lock is held until the caller's commit.
+    """
+    keys = merge_key_columns()
+    values = [c for c in MERGE_COLUMNS if c not in keys]
+    cols = ", ".join(MERGE_COLUMNS)
+
+    staged = MERGE_COLUMNS + ["row_hash"]
+
+    await db.execute(text("SELECT pg_advisory_xact_lock(:ns, 0)"), {"ns": MERGE_LOCK_NAMESPACE})
+    await db.execute(text(
+        f"CREATE TEMP TABLE _merge_stage ON COMMIT DROP AS "
+        f"SELECT {', '.join(staged)} FROM dashboard_data WITH NO DATA"
+    ))
+    # Upload order, so the last record of a repeated key can be kept
+    await db.execute(text("ALTER TABLE _merge_stage ADD COLUMN _ord bigserial"))
+    stage_insert = text(
+        f"INSERT INTO _merge_stage ({', '.join(staged)}) VALUES ({', '.join(':' + c for c in staged)})"
+    )
+    async for records in chunks:
+        for i in range(0, len(records), STAGE_CHUNK_SIZE):
+            chunk = records[i:i + STAGE_CHUNK_SIZE]
+            await db.execute(stage_insert, [{c: r.get(c) for c in staged} for r in chunk])
+    await db.execute(text(
+        f"DELETE FROM _merge_stage s USING _merge_stage t "
+        f"WHERE {' AND '.join(f's.{c} = t.{c}' for c in keys)} AND t._ord > s._ord"
+    ))
+    staged_rows = await db.scalar(text("SELECT count(*) FROM _merge_stage"))
+    await db.execute(text("ANALYZE _merge_stage"))
+
+    match = " AND ".join(f"d.{c} = s.{c}" for c in keys)
+    live = "NOT EXISTS (SELECT 1 FROM data_sources x WHERE x.id = d.source_id AND x.deleted_at IS NOT NULL)"
+    # Rows stored before fingerprints existed have no row_hash; compare their columns instead
+    changed = (
+        f"d.row_hash IS DISTINCT FROM s.row_hash AND (d.row_hash IS NOT NULL OR "
+        f"({', '.join(f'd.{c}' for c in values)}) IS DISTINCT FROM ({', '.join(f's.{c}' for c in values)}))"
+    )
+    result = await db.execute(text(f"""
+        WITH updated AS (
+            UPDATE dashboard_data d
+            SET {", ".join(f"{c} = s.{c}" for c in values)}, row_hash = s.row_hash, source_id = :source_id
+            FROM _merge_stage s
+            WHERE {match} AND {live} AND {changed}
+            RETURNING d.id, d.reporting_day
+        ),
+        reowned AS (
+            UPDATE dashboard_data d
+            SET source_id = :source_id
+            FROM _merge_stage s
+            WHERE {match} AND {live} AND NOT ({changed}) AND d.source_id IS DISTINCT FROM :source_id
+            RETURNING d.id
+        ),
+        inserted AS (
+            INSERT INTO dashboard_data (source_id, {cols}, row_hash)
+            SELECT :source_id, {", ".join(f"s.{c}" for c in MERGE_COLUMNS)}, s.row_hash
+            FROM _merge_stage s
+            WHERE NOT EXISTS (SELECT 1 FROM dashboard_data d WHERE {match} AND {live})
+            RETURNING id, reporting_day
+        ),
+        logged AS (
+            INSERT INTO dashboard_data_changes (source_id, row_id, reporting_day, change)
+            SELECT :source_id, id, reporting_day, 'update' FROM updated
+            UNION ALL
+            SELECT :source_id, id, reporting_day, 'insert' FROM inserted
+            RETURNING change, reporting_day
+        )
+        SELECT change, to_char(reporting_day, 'YYYY-MM') AS month, count(*) AS cnt
+        FROM logged GROUP BY 1, 2
+        UNION ALL
+        SELECT 'reown', NULL, count(*) FROM reowned
+    """), {"source_id": source_id})
+
+    stats = {"mode": "merge", "key": keys, "inserted": 0, "updated": 0, "reowned": 0, "months": set()}
+    for change, month, cnt in result.all():
+        if change == "reown":
+            stats["reowned"] = cnt
+            continue
+        stats["inserted" if change == "insert" else "updated"] += cnt
+        stats["months"].add(month)
+    stats["unchanged"] = max(staged_rows - stats["inserted"] - stats["updated"], 0)
+    stats["months"] = sorted(stats["months"])
+    logger.info(
+        f"Merged source {source_id} on {keys}: {stats['inserted']} inserted, "
+        f"{stats['updated']} updated, {stats['unchanged']} unchanged ({stats['reowned']} taken over)"
+    )
+    return stats
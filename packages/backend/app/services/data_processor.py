@@ -1,14 +1,85 @@
+import numpy as np
 import pandas as pd
+from pandas.io.parsers import TextParser
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+import importlib.util
+import multiprocessing
 import re
-from datetime import datetime
+import json
+from datetime import date, datetime
+from app.core.config import settings
+
+
+def excel_engine() -> str:
+    """Excel backend from EXCEL_ENGINE; 'auto' prefers calamine when it is installed"""
+    engine = settings.EXCEL_ENGINE
+    if engine == "auto":
+        engine = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+    return engine
+
+
+def _excel_cell(value: Any) -> Any:
+    """A raw cell value as pandas' openpyxl reader hands it to the parser"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Excel stores every number as a float; whole ones are read as ints
+        return int(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def excel_rows_to_frame(rows: Iterable[Iterable[Any]]) -> pd.DataFrame:
+    """Frame from raw sheet rows (header first), built as pd.read_excel builds it with openpyxl.
+    
+    Rows read by calamine or by openpyxl directly go through the same cell
+    conversion, trimming and type inference, so dtypes and values do not
+    depend on the backend.
+    """
+    data, last = [], -1
+    for i, row in enumerate(rows):
+        converted = [_excel_cell(v) for v in row]
+        while converted and converted[-1] == "":
+            converted.pop()
+        if converted:
+            last = i
+        data.append(converted)
+    data = data[:last + 1]
+    if not data:
+        return pd.DataFrame()
+    width = max(len(r) for r in data)
+    data = [r + [""] * (width - len(r)) for r in data]
+    return TextParser(data, header=0, skip_blank_lines=False).read()
+
+
+def read_excel_sheet(file_path: str, sheet: str = None, engine: str = "openpyxl") -> pd.DataFrame:
+    """Parse one sheet (the first when sheet is None); module-level so worker processes can run it"""
+    if engine == "calamine":
+        from python_calamine import CalamineWorkbook
+        
+        wb = CalamineWorkbook.from_path(file_path)
+        return excel_rows_to_frame(wb.get_sheet_by_name(sheet if sheet is not None else wb.sheet_names[0]).to_python())
+    return pd.read_excel(file_path, sheet_name=sheet if sheet is not None else 0)
+
 
 class FileParser:
     """Parse various file formats into DataFrame"""
     
+    JSON_READ_SIZE = 64 * 1024
+    CHUNK_ROWS = 50000
+    NDJSON_EXTENSIONS = ['.ndjson', '.jsonl']
+    
     @staticmethod
-    def parse(file_path: str, encoding: str = None) -> pd.DataFrame:
+    def parse(file_path: str, encoding: str = None, nrows: int = None, sheet: str = None, combine: bool = False) -> pd.DataFrame:
+        """Parse a file; with nrows only the first nrows data rows are read.
+        
+        For workbooks, sheet selects a sheet by name (default: the first), and
+        combine reads every sheet into one frame as sheets=combine uploads do.
+        """
         path = Path(file_path)
         ext = path.suffix.lower()
         
@@ -17,17 +88,155 @@ class FileParser:
             for enc in [encoding, 'utf-8', 'utf-16', 'latin-1']:
                 if enc:
                     try:
-                        return pd.read_csv(file_path, encoding=enc)
+                        return pd.read_csv(file_path, encoding=enc, nrows=nrows)
                     except (UnicodeDecodeError, pd.errors.ParserError):
                         continue
-            return pd.read_csv(file_path)
+            return pd.read_csv(file_path, nrows=nrows)
+        elif ext in ['.xlsx', '.xls'] and combine:
+            df = pd.concat(FileParser.parse_sheets(file_path).values(), ignore_index=True)
+            return df if nrows is None else df.head(nrows)
+        elif ext == '.xlsx' and nrows is not None:
+            return FileParser._xlsx_head(file_path, nrows, sheet)
         elif ext in ['.xlsx', '.xls']:
-            return pd.read_excel(file_path)
+            if nrows is not None:
+                return pd.read_excel(file_path, sheet_name=sheet if sheet is not None else 0, nrows=nrows)
+            return read_excel_sheet(file_path, sheet, excel_engine())
         elif ext == '.json':
-            return pd.read_json(file_path)
+            # Arrays of records are decoded incrementally instead of as one document
+            if not FileParser._is_json_array(file_path):
+                df = pd.read_json(file_path)
+                return df if nrows is None else df.head(nrows)
+            if nrows is not None:
+                return pd.DataFrame.from_records(list(islice(FileParser.iter_json_records(file_path), nrows)))
+            return FileParser._concat(FileParser.iter_chunks(file_path))
+        elif ext in FileParser.NDJSON_EXTENSIONS:
+            if nrows is not None:
+                return pd.read_json(file_path, lines=True, nrows=nrows)
+            return FileParser._concat(FileParser.iter_chunks(file_path))
         else:
             raise ValueError(f"Unsupported file type: {ext}")
     
+    @staticmethod
+    def sheet_names(file_path: str) -> list[str]:
+        if excel_engine() == "calamine":
+            from python_calamine import CalamineWorkbook
+            return CalamineWorkbook.from_path(file_path).sheet_names
+        return pd.ExcelFile(file_path).sheet_names
+    
+    @staticmethod
+    def parse_sheets(file_path: str, sheets: list[str] = None) -> dict[str, pd.DataFrame]:
+        """Parse several sheets of a workbook (default: all), one worker process per sheet"""
+        if sheets is None:
+            sheets = FileParser.sheet_names(file_path)
+        engine = excel_engine()
+        if len(sheets) <= 1:
+            return {name: read_excel_sheet(file_path, name, engine) for name in sheets}
+        
+        workers = min(len(sheets), settings.EXCEL_PARSE_WORKERS)
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            frames = pool.map(read_excel_sheet, [file_path] * len(sheets), sheets, [engine] * len(sheets))
+            return dict(zip(sheets, frames))
+    
+    @staticmethod
+    def _xlsx_head(file_path: str, nrows: int, sheet: str = None) -> pd.DataFrame:
+        """First nrows of a sheet, streamed without loading the workbook"""
+        from openpyxl import load_workbook
+        
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet] if sheet is not None else wb.worksheets[0]
+            return excel_rows_to_frame(ws.iter_rows(max_row=nrows + 1, values_only=True))
+        finally:
+            wb.close()
+    
+    @staticmethod
+    def _is_json_array(file_path: str) -> bool:
+        with open(file_path, encoding='utf-8') as f:
+            while True:
+                chunk = f.read(FileParser.JSON_READ_SIZE)
+                stripped = chunk.lstrip()
+                if stripped or not chunk:
+                    return stripped.startswith('[')
+    
+    @staticmethod
+    def iter_json_records(file_path: str) -> Iterator[Any]:
+        """Elements of a top-level JSON array, decoded incrementally in JSON_READ_SIZE reads"""
+        decoder = json.JSONDecoder()
+        with open(file_path, encoding='utf-8') as f:
+            buf = ''
+            while not buf:
+                chunk = f.read(FileParser.JSON_READ_SIZE)
+                if not chunk:
+                    return
+                buf = chunk.lstrip()
+            if not buf.startswith('['):
+                raise ValueError("JSON document is not an array")
+            pos, eof = 1, False
+            while True:
+                # Skip separators between elements
+                while pos < len(buf) and (buf[pos].isspace() or buf[pos] == ','):
+                    pos += 1
+                if pos < len(buf) and buf[pos] == ']':
+                    return
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                    # A value running to the end of the buffer may be cut short
+                    if end < len(buf) or eof:
+                        yield value
+                        pos = end
+                        continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                chunk = f.read(FileParser.JSON_READ_SIZE)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+    
+    @staticmethod
+    def _csv_chunks(file_path: str, chunksize: int, encoding: str = None) -> Iterator[pd.DataFrame]:
+        # The encoding is picked on the first chunk, as parse() does for the whole file
+        for enc in [encoding, 'utf-8', 'utf-16', 'latin-1']:
+            if enc:
+                try:
+                    reader = pd.read_csv(file_path, encoding=enc, chunksize=chunksize)
+                    first = next(reader)
+                except (UnicodeDecodeError, pd.errors.ParserError):
+                    continue
+                yield first
+                yield from reader
+                return
+        yield from pd.read_csv(file_path, chunksize=chunksize)
+    
+    @staticmethod
+    def iter_chunks(file_path: str, chunksize: int = None, encoding: str = None) -> Iterator[pd.DataFrame]:
+        """Parse a file as DataFrames of at most chunksize rows.
+        
+        CSV, NDJSON and top-level JSON arrays are read incrementally, so memory
+        is bounded by the chunk size rather than the file; other formats are
+        yielded as one frame.
+        """
+        chunksize = chunksize or FileParser.CHUNK_ROWS
+        ext = Path(file_path).suffix.lower()
+        
+        if ext == '.csv':
+            yield from FileParser._csv_chunks(file_path, chunksize, encoding)
+        elif ext in FileParser.NDJSON_EXTENSIONS:
+            with pd.read_json(file_path, lines=True, chunksize=chunksize) as reader:
+                yield from reader
+        elif ext == '.json' and FileParser._is_json_array(file_path):
+            records = FileParser.iter_json_records(file_path)
+            while batch := list(islice(records, chunksize)):
+                yield pd.DataFrame.from_records(batch)
+        else:
+            yield FileParser.parse(file_path, encoding=encoding)
+    
+    @staticmethod
+    def _concat(chunks: Iterator[pd.DataFrame]) -> pd.DataFrame:
+        frames = list(chunks)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    
     @staticmethod
     def get_metadata(df: pd.DataFrame) -> dict:
         return {
@@ -128,13 +337,19 @@ class SchemaDetector:
 class DataValidator:
     """DM-001-06: Validate data format, duplicates, encoding"""
     
+    @staticmethod
+    def row_hashes(df: pd.DataFrame) -> np.ndarray:
+        """64-bit fingerprint per row; cells are hashed as text so equal rows match across files"""
+        canonical = df.astype(str).where(df.notna())
+        return pd.util.hash_pandas_object(canonical, index=False).to_numpy().view(np.int64)
+    
     @staticmethod
     def validate(df: pd.DataFrame) -> dict:
         errors = []
         warnings = []
         
         # Check duplicates
-        dup_count = df.duplicated().sum()
+        dup_count = pd.Series(DataValidator.row_hashes(df)).duplicated().sum()
         if dup_count > 0:
             warnings.append(f"Found {dup_count} duplicate rows")
         
@@ -186,23 +401,31 @@ class DataCleaner:
 class DataTransformer:
     """Transform data for visualization"""
     
+    @staticmethod
+    def _pivot_rows(grouped: pd.DataFrame) -> list[dict]:
+        """One {"name": x, <group>: value, ...} dict per pivot row, without per-cell lookups"""
+        grouped.columns = [str(c) for c in grouped.columns]
+        records = grouped.to_dict(orient="records")
+        return [{"name": str(idx), **rec} for idx, rec in zip(grouped.index, records)]
+    
     @staticmethod
     def to_chart_data(df: pd.DataFrame, x_col: str, y_col: str = None, agg: str = "count", group_by: str = None) -> list[dict]:
         if agg == "count":
             if group_by:
                 grouped = df.groupby([x_col, group_by]).size().unstack(fill_value=0)
-                return [{"name": str(idx), **{str(c): int(grouped.loc[idx, c]) for c in grouped.columns}} for idx in grouped.index]
-            return [{"name": str(k), "value": int(v)} for k, v in df.groupby(x_col).size().items()]
+                return DataTransformer._pivot_rows(grouped.astype(int))
+            counts = df.groupby(x_col).size()
+            return [{"name": str(k), "value": v} for k, v in zip(counts.index, counts.astype(int).tolist())]
         
         if not y_col:
             y_col = df.select_dtypes(include='number').columns[0] if len(df.select_dtypes(include='number').columns) > 0 else df.columns[0]
         
         if group_by:
             grouped = df.groupby([x_col, group_by])[y_col].agg(agg).unstack(fill_value=0)
-            return [{"name": str(idx), **{str(c): float(grouped.loc[idx, c]) for c in grouped.columns}} for idx in grouped.index]
+            return DataTransformer._pivot_rows(grouped.astype(float))
         
         grouped = df.groupby(x_col)[y_col].agg(agg)
-        return [{"name": str(k), "value": float(v)} for k, v in grouped.items()]
+        return [{"name": str(k), "value": v} for k, v in zip(grouped.index, grouped.astype(float).tolist())]
     
     @staticmethod
     def _serialize_row(row: dict) -> dict:
@@ -219,6 +442,32 @@ class DataTransformer:
                 result[key] = val
         return result
     
+    @staticmethod
+    def column_type(series: pd.Series) -> str:
+        if pd.api.types.is_bool_dtype(series):
+            return "boolean"
+        if pd.api.types.is_numeric_dtype(series):
+            return "number"
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return "date"
+        return "string"
+    
+    @staticmethod
+    def to_columns(df: pd.DataFrame, **meta) -> str:
+        """JSON text with the column names once and one array per column.
+        
+        Each column is encoded by pandas' C serializer (NaN -> null, ISO dates),
+        with no per-cell Python work. meta is added as top-level keys.
+        """
+        columns = [df.iloc[:, i] for i in range(len(df.columns))]
+        head = json.dumps({
+            **meta,
+            "fields": [str(c) for c in df.columns],
+            "types": [DataTransformer.column_type(s) for s in columns],
+        }, default=str)
+        arrays = ",".join(s.to_json(orient="values", date_format="iso") for s in columns)
+        return f'{head[:-1]}, "data": [{arrays}]}}'
+    
     @staticmethod
     def to_json(df: pd.DataFrame, limit: int = None) -> list[dict]:
         if limit:
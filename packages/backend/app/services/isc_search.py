@@ -0,0 +1,68 @@
+"""
+Item-code search over one ISC version.
+
+Codes are kept as a sorted list, which doubles as an implicit trie: all codes
+that share a prefix form a contiguous range, found with bisect. Prefix search
+is one bisect plus a scan of the results. Fuzzy search walks the trie
+depth-first, carrying one Levenshtein DP row per prefix, and prunes a branch
+as soon as no cell in its row is within the distance bound. Only the band of
+the row around the diagonal is computed; cells outside it always exceed the
+bound. No node objects are allocated, so the index costs no memory beyond
+the list itself.
+"""
+from bisect import bisect_left
+from typing import Iterable
+
+MAX_CODEPOINT = 0x10FFFF
+
+
+class ItemCodeIndex:
+    def __init__(self, codes: Iterable[str]):
+        self.codes = sorted(codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def prefix(self, prefix: str, limit: int) -> list[str]:
+        """First limit codes (in sort order) starting with prefix"""
+        codes = self.codes
+        out = []
+        i = bisect_left(codes, prefix)
+        while i < len(codes) and len(out) < limit and codes[i].startswith(prefix):
+            out.append(codes[i])
+            i += 1
+        return out
+
+    def fuzzy(self, query: str, max_distance: int, limit: int) -> list[tuple[int, str]]:
+        """Up to limit (distance, code) pairs within max_distance edits of query, closest first"""
+        codes = self.codes
+        results = []
+        width = len(query) + 1
+        over = max_distance + 1
+
+        def walk(depth: int, lo: int, hi: int, prev_row: list[int]):
+            # codes[lo:hi] share the prefix codes[lo][:depth], whose DP row is prev_row
+            i = lo
+            if len(codes[lo]) == depth:
+                if prev_row[-1] <= max_distance:
+                    results.append((prev_row[-1], codes[lo]))
+                i += 1
+            while i < hi:
+                char = codes[i][depth]
+                if ord(char) == MAX_CODEPOINT:
+                    j = hi
+                else:
+                    j = bisect_left(codes, codes[i][:depth] + chr(ord(char) + 1), i, hi)
+                # Only cells within max_distance of the diagonal can stay in bound
+                row = [over] * width
+                row[0] = min(depth + 1, over)
+                for k in range(max(1, depth + 1 - max_distance), min(width - 1, depth + 1 + max_distance) + 1):
+                    row[k] = min(row[k - 1] + 1, prev_row[k] + 1, prev_row[k - 1] + (query[k - 1] != char), over)
+                if min(row) <= max_distance:
+                    walk(depth + 1, i, j, row)
+                i = j
+
+        if codes:
+            walk(0, 0, len(codes), [min(k, over) for k in range(width)])
+        results.sort()
+        return results[:limit]
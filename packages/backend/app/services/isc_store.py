@@ -0,0 +1,315 @@
+"""
+Versioned ISC master shared by all workers.
+
+Each version of the master is an immutable Arrow file, UPLOAD_DIR/isc/<version>.arrow,
+that workers memory-map. UPLOAD_DIR/isc/CURRENT names the live version. When
+it changes, the new version is also written to Redis (isc:version) and
+published on isc:updates.
+
+Every worker runs run_isc_refresher in the background. It loads the new
+version off the request path and swaps it in with one assignment, so
+requests only read current_store() and never stat or parse a file. If no
+update arrives within ISC_REFRESH_INTERVAL seconds, or Redis is unavailable,
+the refresher reads CURRENT itself. That poll also picks up a master_isc.csv
+dropped into UPLOAD_DIR and publishes it as a new version.
+
+ISC uploads are merged into the live version by merge_isc_upload. The
+upload's item codes are upserted and the result is published as a new
+version with one row per item, sorted by code. Every publish holds the ISC
+advisory lock, and once a version is live, all versions but it and the one
+it replaced are deleted.
+"""
+import asyncio
+import glob
+import logging
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import text
+
+from app.core.cache import set_version, subscribe
+from app.core.config import settings
+from app.core.database import engine
+from app.services.arrow_io import frame_to_arrow, map_arrow, write_arrow
+from app.services.isc_search import ItemCodeIndex
+
+logger = logging.getLogger(__name__)
+
+ISC_DIR = os.path.join(settings.UPLOAD_DIR, "isc")
+CURRENT_PATH = os.path.join(ISC_DIR, "CURRENT")
+# Last master_isc.csv version imported; its file may since have been pruned
+CSV_IMPORTED_PATH = os.path.join(ISC_DIR, "CSV_IMPORTED")
+MASTER_ISC_PATH = os.path.join(settings.UPLOAD_DIR, "master_isc.csv")
+ISC_VERSION_KEY = "isc:version"
+ISC_CHANNEL = "isc:updates"
+# pg advisory lock namespace serializing merges of ISC uploads across workers
+ISC_LOCK_NAMESPACE = 29002
+MASTER_COLUMNS = ["Item code", "Avg Consume", "_item_upper"]
+
+
+def version_path(version: str) -> str:
+    return os.path.join(ISC_DIR, f"{version}.arrow")
+
+
+def build_isc_lookup(table: pa.Table) -> dict:
+    """Normalized item code -> abs(first non-NaN Avg Consume), or None if the item has none"""
+    lookup = {}
+    for code, avg in zip(table["_item_upper"].to_pylist(), table["Avg Consume"].to_pylist()):
+        if code is not None and lookup.get(code) is None:
+            lookup[code] = None if avg is None else abs(float(avg))
+    return lookup
+
+
+class IscStore:
+    """One immutable version of the ISC master: mapped table, item lookup and code search index"""
+
+    def __init__(self, version: str, table: pa.Table):
+        self.version = version
+        self.table = table
+        self.lookup = build_isc_lookup(table)
+        self.search_index = ItemCodeIndex(self.lookup)
+
+    @classmethod
+    def open(cls, version: str) -> "IscStore":
+        return cls(version, map_arrow(version_path(version)))
+
+
+def normalize_item_codes(codes: pd.Series) -> pd.Series:
+    return codes.astype(str).str.strip().str.upper().where(codes.notna())
+
+
+def write_isc_version(df: pd.DataFrame, version: str):
+    """Write a master frame (Item code, Avg Consume, ...) as an immutable version"""
+    df = df.copy()
+    df["_item_upper"] = normalize_item_codes(df["Item code"])
+    os.makedirs(ISC_DIR, exist_ok=True)
+    write_arrow(frame_to_arrow(df), version_path(version))
+
+
+def _read_version_file(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_current_version() -> Optional[str]:
+    return _read_version_file(CURRENT_PATH)
+
+
+def _write_version_file(path: str, version: str):
+    os.makedirs(ISC_DIR, exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, path)
+
+
+def _write_current_version(version: str):
+    _write_version_file(CURRENT_PATH, version)
+
+
+def _csv_version() -> Optional[str]:
+    """Version name for master_isc.csv if it has not been converted yet"""
+    if not os.path.exists(MASTER_ISC_PATH):
+        return None
+    version = f"csv-{int(os.path.getmtime(MASTER_ISC_PATH) * 1000)}"
+    # Stores from before the marker existed only have the version file
+    if _read_version_file(CSV_IMPORTED_PATH) == version or os.path.exists(version_path(version)):
+        return None
+    return version
+
+
+def _build_csv_version(version: str):
+    write_isc_version(pd.read_csv(MASTER_ISC_PATH, dtype={"Item code": str}), version)
+
+
+def prune_isc_versions(keep: set):
+    """Delete version files not in keep; workers that still map one keep their mapping"""
+    for path in glob.glob(os.path.join(ISC_DIR, "*.arrow")):
+        if os.path.basename(path)[:-len(".arrow")] not in keep:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove old ISC version {path}: {e}")
+
+
+@asynccontextmanager
+async def isc_lock():
+    """Serialize publishing ISC versions across workers"""
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT pg_advisory_lock(:ns, 0)"), {"ns": ISC_LOCK_NAMESPACE})
+        await conn.commit()
+        try:
+            yield
+        finally:
+            await conn.rollback()
+            await conn.execute(text("SELECT pg_advisory_unlock(:ns, 0)"), {"ns": ISC_LOCK_NAMESPACE})
+            await conn.commit()
+
+
+def _one_row_per_item(df: pd.DataFrame) -> pd.DataFrame:
+    """Resolve each code to its first non-NaN Avg Consume, as build_isc_lookup does"""
+    df = df[df["_item_upper"].notna() & (df["_item_upper"] != "")]
+    valued = df.dropna(subset=["Avg Consume"]).drop_duplicates("_item_upper")
+    unvalued = df.drop_duplicates("_item_upper")
+    unvalued = unvalued[~unvalued["_item_upper"].isin(valued["_item_upper"])]
+    return pd.concat([valued, unvalued], ignore_index=True)
+
+
+def merge_master(base: Optional[pa.Table], upload: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """Upsert upload (Item code, Avg Consume) into the base master by normalized code.
+
+    A missing Avg Consume in the upload never overwrites a known value.
+    Returns the merged master, sorted by code, and insert/update counts.
+    """
+    new = upload[["Item code", "Avg Consume"]].copy()
+    # Numeric-looking codes are read as floats when the column has blanks
+    codes = new["Item code"]
+    new["Item code"] = codes.map(
+        lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else str(v).strip()
+    ).where(codes.notna())
+    new["_item_upper"] = normalize_item_codes(new["Item code"])
+    new = _one_row_per_item(new)
+    if base is None:
+        old = pd.DataFrame(columns=MASTER_COLUMNS)
+    else:
+        old = _one_row_per_item(base.select(MASTER_COLUMNS).to_pandas())
+
+    previous = new["_item_upper"].map(old.set_index("_item_upper")["Avg Consume"])
+    inserted = ~new["_item_upper"].isin(old["_item_upper"])
+    updated = ~inserted & new["Avg Consume"].notna() & (previous.isna() | (previous != new["Avg Consume"]))
+    changes = new[inserted | updated]
+
+    merged = pd.concat([old[~old["_item_upper"].isin(changes["_item_upper"])], changes], ignore_index=True)
+    merged = merged.sort_values("_item_upper", kind="stable", ignore_index=True)
+    stats = {
+        "inserted": int(inserted.sum()), "updated": int(updated.sum()),
+        "unchanged": int(len(new) - inserted.sum() - updated.sum()), "items": len(merged),
+    }
+    return merged, stats
+
+
+@asynccontextmanager
+async def merge_isc_upload(upload: pd.DataFrame, source_id: int):
+    """Merge a processed ISC upload into the live master as a new version.
+
+    Yields the merge stats. The version is published only when the block exits
+    without an error, so the caller can commit the upload's source first; on an
+    error it is discarded. Nothing is published when no item changed.
+    """
+    async with isc_lock():
+        base_version = await asyncio.to_thread(read_current_version)
+        base = await asyncio.to_thread(map_arrow, version_path(base_version)) if base_version else None
+        merged, stats = await asyncio.to_thread(merge_master, base, upload)
+        stats.update({"mode": "isc", "base_version": base_version, "version": base_version})
+        version = None
+        if stats["inserted"] or stats["updated"]:
+            version = f"v{int(time.time() * 1000)}-{source_id}"
+            await asyncio.to_thread(write_isc_version, merged, version)
+            stats["version"] = version
+        try:
+            yield stats
+        except BaseException:
+            if version:
+                os.remove(version_path(version))
+            raise
+        if version:
+            await publish_isc_version(version)
+    logger.info(
+        f"ISC upload {source_id}: {stats['inserted']} inserted, {stats['updated']} updated, "
+        f"{stats['unchanged']} unchanged -> version {stats['version']}"
+    )
+
+
+_current: Optional[IscStore] = None
+_load_lock = asyncio.Lock()
+# Set once the first load attempt finished, so "no data" can be told apart from "loading"
+ready = asyncio.Event()
+
+
+def current_store() -> Optional[IscStore]:
+    return _current
+
+
+async def load_isc_version(version: Optional[str]):
+    """Swap in version unless it is already live"""
+    global _current
+    if not version or (_current is not None and _current.version == version):
+        return
+    async with _load_lock:
+        if _current is not None and _current.version == version:
+            return
+        try:
+            store = await asyncio.to_thread(IscStore.open, version)
+        except (OSError, pa.ArrowInvalid, KeyError) as e:
+            logger.warning(f"Could not load ISC version {version}: {e}")
+            return
+        _current = store
+    logger.info(f"Loaded ISC version {version}: {len(store.lookup)} items")
+
+
+async def publish_isc_version(version: str):
+    """Make version the live master for every worker; the caller holds isc_lock"""
+    previous = await asyncio.to_thread(read_current_version)
+    await asyncio.to_thread(_write_current_version, version)
+    await set_version(ISC_VERSION_KEY, ISC_CHANNEL, version)
+    await load_isc_version(version)
+    # Workers that have not swapped yet still load the previous version
+    await asyncio.to_thread(prune_isc_versions, {version, previous})
+
+
+async def refresh_isc_store():
+    """Poll path: publish a changed legacy CSV, then load the live version"""
+    if await asyncio.to_thread(_csv_version):
+        async with isc_lock():
+            # Another worker may have converted it while this one waited
+            csv_version = await asyncio.to_thread(_csv_version)
+            if csv_version:
+                await asyncio.to_thread(_build_csv_version, csv_version)
+                await publish_isc_version(csv_version)
+                await asyncio.to_thread(_write_version_file, CSV_IMPORTED_PATH, csv_version)
+    # CURRENT is authoritative; the Redis key may be stale after a Redis outage
+    await load_isc_version(await asyncio.to_thread(read_current_version))
+
+
+async def run_isc_refresher():
+    """Per-worker background task: follow isc:updates, poll as a fallback"""
+    interval = settings.ISC_REFRESH_INTERVAL
+    try:
+        await refresh_isc_store()
+    except Exception as e:
+        logger.error(f"Initial ISC load failed: {e}", exc_info=True)
+    ready.set()
+
+    while True:
+        pubsub = None
+        try:
+            pubsub = await subscribe(ISC_CHANNEL)
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=interval)
+                if message:
+                    await load_isc_version(message["data"])
+                else:
+                    await refresh_isc_store()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"ISC update subscription failed, polling instead: {e}")
+            await asyncio.sleep(interval)
+            try:
+                await refresh_isc_store()
+            except Exception as refresh_err:
+                logger.error(f"ISC refresh failed: {refresh_err}")
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
@@ -0,0 +1,72 @@
+"""
+Monthly partitions of dashboard_data (see migrations/002_partition_dashboard_data.sql).
+"""
+import logging
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+def month_bounds(month: str) -> tuple[date, date]:
+    """First day of a YYYY-MM month and first day of the following month"""
+    year, mon = (int(p) for p in month.split("-"))
+    start = date(year, mon, 1)
+    end = date(year + 1, 1, 1) if mon == 12 else date(year, mon + 1, 1)
+    return start, end
+
+
+def partition_name(month: str) -> str:
+    start, _ = month_bounds(month)
+    return f"dashboard_data_y{start:%Y}m{start:%m}"
+
+
+async def ensure_month_partitions(days: Iterable[date]):
+    """Create the monthly partitions needed to insert rows for the given days.
+
+    Runs on its own connection and commits straight away: attaching a
+    partition locks the parent table, so it must not wait on a long insert.
+    Call it before the caller's session first touches dashboard_data: any open
+    transaction that has read the table blocks it until that transaction ends.
+    """
+    months = {f"{d:%Y-%m}" for d in days if d}
+    if not months:
+        return
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'dashboard_data'::regclass AND c.relname = ANY(:names)"
+            ),
+            {"names": [partition_name(m) for m in months]},
+        )
+        existing = set(result.scalars().all())
+        missing = sorted(m for m in months if partition_name(m) not in existing)
+        for month in missing:
+            start, end = month_bounds(month)
+            name = partition_name(month)
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF dashboard_data "
+                        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+                    ))
+            except DBAPIError as e:
+                # Another worker created it concurrently
+                logger.debug(f"Partition {name} not created: {e}")
+    if missing:
+        logger.info(f"Created dashboard_data partitions for {missing}")
+
+
+async def detach_month_partition(month: str) -> str:
+    """Detach a month from dashboard_data, keeping it as a standalone table"""
+    name = partition_name(month)
+    async with engine.begin() as conn:
+        await conn.execute(text(f"ALTER TABLE dashboard_data DETACH PARTITION {name}"))
+    logger.info(f"Detached partition {name}")
+    return name
@@ -0,0 +1,102 @@
+"""
+Soft deletion of data sources.
+
+Deleting a source only stamps data_sources.deleted_at; dashboard queries hide
+its rows through live_rows() straight away. The rows themselves are removed
+afterwards by purge_source_task in small, throttled batches so a large source
+neither holds a request open nor floods the WAL in one transaction.
+"""
+import asyncio
+import logging
+import os
+
+from sqlalchemy import delete, exists, select, text, tuple_
+
+from app.core.config import settings
+from app.core.database import engine
+from app.models.models import DashboardData, DataSource
+
+logger = logging.getLogger(__name__)
+
+# Namespace for pg advisory locks so two workers never purge the same source
+PURGE_LOCK_NAMESPACE = 29001
+
+
+def live_rows():
+    """Predicate excluding dashboard rows of soft-deleted sources (rows without a source stay visible)"""
+    return ~exists().where(DataSource.id == DashboardData.source_id, DataSource.deleted_at.is_not(None))
+
+
+async def purge_source_task(source_id: int):
+    """Background task: delete a soft-deleted source's rows, then the source itself"""
+    batch_size = settings.PURGE_BATCH_SIZE
+    purged = 0
+    try:
+        async with engine.connect() as conn:
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:ns, :id)"), {"ns": PURGE_LOCK_NAMESPACE, "id": source_id}
+            )
+            await conn.commit()
+            if not locked:
+                logger.info(f"Purge of source {source_id} already running elsewhere")
+                return
+            try:
+                source = (await conn.execute(
+                    select(DataSource.file_path, DataSource.deleted_at).where(DataSource.id == source_id)
+                )).one_or_none()
+                if not source or source.deleted_at is None:
+                    return
+
+                batch = (
+                    select(DashboardData.id, DashboardData.reporting_day)
+                    .where(DashboardData.source_id == source_id)
+                    .limit(batch_size)
+                )
+                while True:
+                    result = await conn.execute(
+                        delete(DashboardData).where(
+                            tuple_(DashboardData.id, DashboardData.reporting_day).in_(batch)
+                        )
+                    )
+                    await conn.commit()
+                    purged += result.rowcount
+                    if result.rowcount < batch_size:
+                        break
+                    await asyncio.sleep(settings.PURGE_BATCH_DELAY)
+
+                await conn.execute(delete(DataSource).where(DataSource.id == source_id))
+                await conn.commit()
+                # Other sheets of the same workbook may still use the file
+                file_in_use = await conn.scalar(
+                    select(DataSource.id).where(DataSource.file_path == source.file_path).limit(1)
+                )
+            finally:
+                # A failed batch leaves the transaction aborted; the unlock must not fail with it
+                await conn.rollback()
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(:ns, :id)"), {"ns": PURGE_LOCK_NAMESPACE, "id": source_id}
+                )
+                await conn.commit()
+    except Exception as e:
+        logger.error(f"Purge of source {source_id} failed after {purged} rows: {e}", exc_info=True)
+        return
+
+    if source.file_path and not file_in_use and os.path.exists(source.file_path):
+        try:
+            os.remove(source.file_path)
+        except OSError as e:
+            logger.warning(f"Failed to remove file {source.file_path}: {e}")
+    logger.info(f"Purged source {source_id}: {purged} rows")
+
+
+async def resume_pending_purges():
+    """Restart purges interrupted by a worker restart"""
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(DataSource.id).where(DataSource.deleted_at.is_not(None)))
+            pending = result.scalars().all()
+    except Exception as e:
+        logger.warning(f"Could not look up pending source purges: {e}")
+        return
+    for source_id in pending:
+        await purge_source_task(source_id)
@@ -0,0 +1,245 @@
+"""
+Per-source store behind /datasources/{id}/data and /preview.
+
+Built once at ingestion so browsing a source no longer re-parses the file,
+stringifies every cell for search, or re-sorts the whole frame per request:
+
+* every cell is lower-cased once and factorized into a shared vocabulary of
+  distinct values, with a CSR posting list (value -> row positions)
+* a trigram index over the vocabulary narrows a search to the few distinct
+  values that can contain the term; only those are checked with a substring
+  test and their posting lists merged
+* sort orders are computed per column on first use and kept with the store
+
+Everything lives under UPLOAD_DIR/store/{id}/ as Arrow IPC and .npy files
+that each worker memory-maps, so all workers share one page-cache copy.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from app.core.config import settings
+from app.services.arrow_io import frame_to_arrow, map_array, map_arrow, save_array, write_arrow
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = os.path.join(settings.UPLOAD_DIR, "store")
+
+
+def store_path(source_id: int) -> str:
+    return os.path.join(STORE_DIR, str(source_id))
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _gram_key(gram: str) -> int:
+    # Code points fit in 21 bits, so a trigram packs into one int64
+    return (ord(gram[0]) << 42) | (ord(gram[1]) << 21) | ord(gram[2])
+
+
+def _build_index(df: pd.DataFrame) -> dict:
+    """Vocabulary, postings and trigram arrays for a frame"""
+    n_rows = len(df)
+
+    # Factorize each column, then merge the per-column uniques into one vocabulary
+    col_codes, col_uniques = [], []
+    for col in df.columns:
+        normalized = df[col].astype(str).str.lower().where(df[col].notna(), "")
+        codes, uniques = pd.factorize(normalized)
+        col_codes.append(codes)
+        col_uniques.append(uniques)
+    global_ids, vocab = pd.factorize(np.concatenate(col_uniques) if col_uniques else np.array([], dtype=object))
+    term_ids, offset = [], 0
+    for codes, uniques in zip(col_codes, col_uniques):
+        term_ids.append(global_ids[offset:offset + len(uniques)][codes])
+        offset += len(uniques)
+
+    # CSR postings: rows of term t are postings[indptr[t]:indptr[t + 1]]
+    terms = np.concatenate(term_ids) if term_ids else np.array([], dtype=np.int64)
+    rows = np.tile(np.arange(n_rows, dtype=np.int32), len(term_ids))
+    postings = rows[np.argsort(terms, kind="stable")]
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms, minlength=len(vocab)), out=indptr[1:])
+
+    # Trigram CSR over the vocabulary, keyed by packed trigram
+    grams = defaultdict(list)
+    for tid, term in enumerate(vocab):
+        for gram in _trigrams(term):
+            grams[_gram_key(gram)].append(tid)
+    gram_keys = np.array(sorted(grams), dtype=np.int64)
+    gram_indptr = np.zeros(len(gram_keys) + 1, dtype=np.int64)
+    np.cumsum([len(grams[k]) for k in gram_keys], out=gram_indptr[1:])
+    gram_ids = np.array([tid for k in gram_keys for tid in grams[k]], dtype=np.int32)
+
+    return {
+        "vocab": pa.table({"term": pa.array(vocab, type=pa.string())}),
+        "indptr": indptr, "postings": postings,
+        "gram_keys": gram_keys, "gram_indptr": gram_indptr, "gram_ids": gram_ids,
+    }
+
+
+class SourceStore:
+    """Memory-mapped rows of one source plus its search index and sort orders"""
+
+    ARRAYS = ["indptr", "postings", "gram_keys", "gram_indptr", "gram_ids"]
+
+    def __init__(self, path: str):
+        self.path = path
+        self.table = map_arrow(os.path.join(path, "data.arrow"))
+        self.vocab = map_arrow(os.path.join(path, "vocab.arrow")).column("term")
+        for name in self.ARRAYS:
+            setattr(self, name, map_array(os.path.join(path, f"{name}.npy")))
+        self._arrays = {}
+
+    @property
+    def num_rows(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def columns(self) -> list:
+        return self.table.column_names
+
+    def _gram_terms(self, gram: str) -> Optional[np.ndarray]:
+        key = _gram_key(gram)
+        i = int(np.searchsorted(self.gram_keys, key))
+        if i == len(self.gram_keys) or self.gram_keys[i] != key:
+            return None
+        return self.gram_ids[self.gram_indptr[i]:self.gram_indptr[i + 1]]
+
+    def _matching_terms(self, term: str) -> np.ndarray:
+        grams = _trigrams(term)
+        if grams:
+            posting_lists = sorted((self._gram_terms(g) for g in grams), key=lambda a: 0 if a is None else len(a))
+            if posting_lists[0] is None:
+                return np.array([], dtype=np.int32)
+            candidates = np.asarray(posting_lists[0])
+            for ids in posting_lists[1:]:
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+                if not len(candidates):
+                    return candidates
+        else:
+            candidates = np.arange(len(self.vocab))
+        found = pc.match_substring(self.vocab.take(pa.array(candidates)), term)
+        return candidates[found.to_numpy()]
+
+    def search(self, term: str) -> np.ndarray:
+        """Sorted positions of rows with a cell containing term (case-insensitive)"""
+        terms = self._matching_terms(term.lower())
+        if not len(terms):
+            return np.array([], dtype=np.int32)
+        return np.unique(np.concatenate([self.postings[self.indptr[t]:self.indptr[t + 1]] for t in terms]))
+
+    def _shared_array(self, name: str, compute) -> np.ndarray:
+        """Array cached on disk for all workers, computed by whichever gets there first"""
+        if name not in self._arrays:
+            path = os.path.join(self.path, f"{name}.npy")
+            if not os.path.exists(path):
+                save_array(compute(), path)
+            self._arrays[name] = map_array(path)
+        return self._arrays[name]
+
+    def sort_order(self, column: str, ascending: bool = True) -> np.ndarray:
+        """Row positions sorted by column (stable, missing values last)"""
+        direction = "ascending" if ascending else "descending"
+        return self._shared_array(
+            f"sort-{self.columns.index(column)}-{direction}",
+            lambda: pc.sort_indices(
+                self.table, sort_keys=[(column, direction)], null_placement="at_end"
+            ).to_numpy().astype(np.int64),
+        )
+
+    def sorted_rows(self, column: str, ascending: bool = True, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        order = self.sort_order(column, ascending)
+        if rows is None:
+            return order
+
+        def ranks():
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            return rank
+
+        direction = "ascending" if ascending else "descending"
+        rank = self._shared_array(f"rank-{self.columns.index(column)}-{direction}", ranks)
+        return rows[np.argsort(rank[rows], kind="stable")]
+
+    def take(self, rows: Optional[np.ndarray], start: int, count: int) -> pd.DataFrame:
+        """Materialize one page of rows as a frame"""
+        if rows is None:
+            return self.table.slice(start, count).to_pandas()
+        return self.table.take(pa.array(rows[start:start + count])).to_pandas()
+
+
+def build_source_store(source_id: int, df: pd.DataFrame):
+    """Build and persist the store for a freshly parsed source"""
+    df = df.reset_index(drop=True)
+    final = store_path(source_id)
+    tmp = f"{final}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp)
+    try:
+        write_arrow(frame_to_arrow(df), os.path.join(tmp, "data.arrow"))
+        index = _build_index(df)
+        write_arrow(index.pop("vocab"), os.path.join(tmp, "vocab.arrow"))
+        for name, arr in index.items():
+            save_array(arr, os.path.join(tmp, f"{name}.npy"))
+        os.rename(tmp, final)
+    except OSError:
+        if not os.path.isdir(final):
+            raise
+        # Another worker built it first
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    logger.info(f"Built source store for {source_id}: {len(df)} rows")
+
+
+def drop_source_store(source_id: int):
+    # Workers still mapping the files keep valid mappings until they let go
+    _cache.pop(source_id, None)
+    shutil.rmtree(store_path(source_id), ignore_errors=True)
+
+
+# Per-worker LRU of opened (mapped) stores
+_cache: "OrderedDict[int, SourceStore]" = OrderedDict()
+
+
+def _open(source_id: int, file_path: str, build: bool, sheet: Optional[str], combine: bool) -> Optional[SourceStore]:
+    path = store_path(source_id)
+    if not os.path.isdir(path):
+        if not build:
+            return None
+        # Sources ingested before stores existed, or whose store was removed
+        from app.services.data_processor import FileParser
+        build_source_store(source_id, FileParser.parse(file_path, sheet=sheet, combine=combine))
+    return SourceStore(path)
+
+
+async def get_source_store(
+    source_id: int, file_path: str, build: bool = True, sheet: Optional[str] = None, combine: bool = False
+) -> Optional[SourceStore]:
+    """Open a source's store; with build=False returns None instead of building a missing one.
+
+    sheet and combine select the workbook rows a missing store is rebuilt
+    from, as for FileParser.parse.
+    """
+    store = _cache.get(source_id)
+    if store is not None and os.path.isdir(store.path):
+        _cache.move_to_end(source_id)
+        return store
+
+    store = await asyncio.to_thread(_open, source_id, file_path, build, sheet, combine)
+    if store is None:
+        return None
+    _cache[source_id] = store
+    while len(_cache) > settings.SOURCE_STORE_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return store
@@ -0,0 +1,79 @@
+"""
+Per-stage timing for upload ingestion.
+
+process_upload_task calls lap() after each stage; every lap records the time
+since the previous one, rows/sec when a row count is given, and the peak RSS
+reached during the stage. The summary is stored on DataSource.ingest_metrics.
+
+Stages shared with other sources (the parse of a workbook split into one
+source per sheet) are copied into each source's summary marked "shared" and
+left out of its total_seconds, so totals can be summed across sources.
+
+Memory is measured for the whole worker process, so requests served while a
+file is ingested count towards its peaks. On Linux the peak is reset at every
+lap (/proc/self/clear_refs); elsewhere it is the process-lifetime peak.
+"""
+import logging
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class IngestTelemetry:
+    """Stage laps for one ingestion; shared_stages are laps recorded once for several ingestions"""
+
+    def __init__(self, shared_stages: Optional[list] = None):
+        self.started_at = datetime.now(timezone.utc)
+        self.stages = [{**stage, "shared": True} for stage in shared_stages or []]
+        self._last = time.perf_counter()
+        self._per_stage_peak = _reset_peak_rss()
+
+    def lap(self, stage: str, rows: Optional[int] = None):
+        now = time.perf_counter()
+        seconds = now - self._last
+        entry = {"stage": stage, "seconds": round(seconds, 3), "peak_rss_mb": round(peak_rss_bytes() / 2**20, 1)}
+        if rows is not None:
+            entry["rows"] = rows
+            entry["rows_per_sec"] = round(rows / seconds) if seconds > 0 else None
+        self.stages.append(entry)
+        self._per_stage_peak = _reset_peak_rss()
+        self._last = time.perf_counter()
+
+    def summary(self) -> dict:
+        return {
+            "started_at": self.started_at.isoformat(),
+            "total_seconds": round(sum(s["seconds"] for s in self.stages if not s.get("shared")), 3),
+            "shared_seconds": round(sum(s["seconds"] for s in self.stages if s.get("shared")), 3),
+            "peak_rss_mb": max((s["peak_rss_mb"] for s in self.stages), default=None),
+            "per_stage_peak": self._per_stage_peak,
+            "stages": self.stages,
+        }
+
+    def log(self, source_id: int):
+        laps = ", ".join(f"{s['stage']} {s['seconds']:.2f}s" for s in self.stages)
+        logger.info(f"Ingestion of source {source_id}: {laps}")
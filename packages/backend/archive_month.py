@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Archive one month of dashboard data by detaching its partition.
+
+The month's rows stay in a standalone table (dashboard_data_yYYYYmMM) that can
+be dumped or dropped; dashboards stop seeing them immediately.
+
+Usage: python archive_month.py 2024-01
+"""
+import asyncio
+import sys
+from app.core.cache import cache_delete, bump_data_generation
+from app.services.partitions import detach_month_partition
+
+async def archive(month: str):
+    name = await detach_month_partition(month)
+    await cache_delete("dashboard:*")
+    await bump_data_generation()
+    print(f"✅ Detached {name}")
+    print(f"   Drop it with: DROP TABLE {name};")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    asyncio.run(archive(sys.argv[1]))
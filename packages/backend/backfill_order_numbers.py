@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Backfill production_order_no and row_hash on dashboard rows stored before
+merge ingestion (migrations/004_merge_ingestion.sql).
+
+Merge uploads match rows on MERGE_KEY_COLUMNS, and a NULL key part never
+matches, so a merge into a month holding such rows would insert a second
+copy of them. The order numbers only exist in the uploaded files, so each
+live source with unkeyed rows has its file parsed again.
+
+A source's rows were inserted in file order, so the file's dated rows are
+paired with the source's rows by id. The source is only updated when every
+pair agrees on all the other stored columns. Sources that cannot be
+backfilled (file gone, no Production Order No. column, rows that do not
+line up) are listed; delete them before merging into their months.
+
+Run once after applying migration 004; it is safe to re-run. Exits non-zero
+if any source was left unkeyed.
+
+Usage: python backfill_order_numbers.py [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from sqlalchemy import exists, select, text
+
+from app.api.datasources import dashboard_records, normalize_dataframe, workbook_options
+from app.core.database import async_session
+from app.models.models import DashboardData, DataSource
+from app.services.dashboard_merge import MERGE_COLUMNS
+from app.services.data_processor import FileParser
+
+UPDATE_CHUNK_SIZE = 1000
+COMPARED = [c for c in MERGE_COLUMNS if c != "production_order_no"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be backfilled without writing")
+    return parser.parse_args()
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+async def backfill_source(db, source: DataSource, dry_run: bool) -> str:
+    """Backfill one source; returns why it was skipped, or '' when done"""
+    if not source.file_path or not os.path.exists(source.file_path):
+        return "file not found"
+    df = await asyncio.to_thread(FileParser.parse, source.file_path, **workbook_options(source))
+    if "Production Order No." not in df.columns:
+        return "file has no Production Order No. column"
+    records = [r for r in dashboard_records(normalize_dataframe(df), source.id) if r.get("reporting_day")]
+
+    result = await db.execute(text(
+        f"SELECT id, production_order_no, {', '.join(COMPARED)} FROM dashboard_data "
+        f"WHERE source_id = :id ORDER BY id"
+    ), {"id": source.id})
+    rows = result.mappings().all()
+    if len(rows) != len(records):
+        return f"{len(rows)} stored rows but {len(records)} dated rows in the file"
+
+    updates = []
+    for row, record in zip(rows, records):
+        if any(_text(row[c]) != _text(record.get(c)) for c in COMPARED):
+            return f"row {row['id']} does not match its line in the file"
+        if row["production_order_no"] is not None and row["production_order_no"] != record.get("production_order_no"):
+            return f"row {row['id']} already has a different order number"
+        updates.append({
+            "id": row["id"], "day": row["reporting_day"],
+            "order_no": record.get("production_order_no"), "row_hash": record["row_hash"],
+        })
+    if not dry_run:
+        for i in range(0, len(updates), UPDATE_CHUNK_SIZE):
+            await db.execute(text(
+                "UPDATE dashboard_data SET production_order_no = :order_no, row_hash = :row_hash "
+                "WHERE id = :id AND reporting_day = :day"
+            ), updates[i:i + UPDATE_CHUNK_SIZE])
+        await db.commit()
+    print(f"✅ Source {source.id} ({source.name}): {len(updates)} rows {'to backfill' if dry_run else 'backfilled'}")
+    return ""
+
+
+async def backfill(dry_run: bool) -> int:
+    async with async_session() as db:
+        unkeyed = exists().where(DashboardData.source_id == DataSource.id, DashboardData.production_order_no.is_(None))
+        result = await db.execute(
+            select(DataSource).where(DataSource.deleted_at.is_(None), unkeyed).order_by(DataSource.id)
+        )
+        sources = result.scalars().all()
+        skipped = 0
+        for source in sources:
+            reason = await backfill_source(db, source, dry_run)
+            if reason:
+                skipped += 1
+                print(f"⚠️  Source {source.id} ({source.name}) skipped: {reason}")
+    print(f"{len(sources) - skipped} source(s) backfilled, {skipped} skipped")
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    sys.exit(asyncio.run(backfill(args.dry_run)))
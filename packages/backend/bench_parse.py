@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark Excel parsing per backend.
+
+Writes a synthetic dashboard-shaped workbook (or uses --file), then times
+FileParser's single-sheet parse with each available engine and the
+multi-sheet parse run sequentially and in parallel (FileParser.parse_sheets).
+
+It also checks that every engine, and the streamed preview head, produce the
+same frame (dtypes and values) as openpyxl, since schema detection, row
+fingerprints and merge keys are computed from it. Exits non-zero if not.
+
+Usage: python bench_parse.py [--rows 200000] [--sheets 4] [--repeat 3] [--file book.xlsx]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.core.config import settings
+from app.services.data_processor import FileParser, excel_engine, read_excel_sheet
+
+ENGINES = ["openpyxl", "calamine"]
+PREVIEW_ROWS = 500
+HEADER = ["Production Order No.", "Reporting day", "Customer", "Category", "Product", "Status",
+          "Current status", "Production No", "Root cause", "Improvement plan"]
+
+
+def write_workbook(path: str, rows: int, sheets: int):
+    from openpyxl import Workbook
+
+    rng = random.Random(0)
+    wb = Workbook(write_only=True)
+    start = date.today() - timedelta(days=365)
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Sheet{s + 1}")
+        ws.append(HEADER)
+        for i in range(rows):
+            # Blank cells turn whole-number columns into floats, which engines must agree on
+            ws.append([
+                f"PO{s}{i:07d}", start + timedelta(days=rng.randrange(365)),
+                f"Customer {rng.randrange(30)}", f"Category {rng.randrange(10)}",
+                f"Product {rng.randrange(200)}", rng.choice(["LOCK", "HOLD", "FAILURE"]),
+                rng.choice(["RESUMED", "CANCELED"]), rng.randrange(500) if rng.random() > 0.01 else None,
+                f"Root cause {rng.randrange(50)}" if rng.random() > 0.3 else None, f"Plan {rng.randrange(20)}",
+            ])
+    wb.save(path)
+
+
+def timed(fn, repeat: int) -> tuple[float, object]:
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), result
+
+
+def differences(expected, actual) -> str:
+    import pandas as pd
+
+    try:
+        pd.testing.assert_frame_equal(expected, actual)
+        # None and NaN count as equal above, but not once cells are read as text
+        pd.testing.assert_frame_equal(expected.astype(str), actual.astype(str))
+        return ""
+    except AssertionError as e:
+        return str(e).strip().splitlines()[0]
+
+
+def available(engine: str) -> bool:
+    return engine != "calamine" or importlib.util.find_spec("python_calamine") is not None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="Rows per sheet of the synthetic workbook")
+    parser.add_argument("--sheets", type=int, default=4, help="Sheets in the synthetic workbook")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (median is reported)")
+    parser.add_argument("--file", help="Benchmark this workbook instead of a synthetic one")
+    args = parser.parse_args()
+
+    tmpdir = None
+    path = args.file
+    if not path:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, "bench.xlsx")
+        t0 = time.perf_counter()
+        write_workbook(path, args.rows, args.sheets)
+        print(f"Wrote {args.sheets} x {args.rows} rows in {time.perf_counter() - t0:.1f}s "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    engines = [e for e in ENGINES if available(e)]
+    skipped = sorted(set(ENGINES) - set(engines))
+    if skipped:
+        print(f"Not installed: {', '.join(skipped)}")
+
+    print(f"\n{'engine':<10} {'first sheet':>12} {'rows/s':>12} {'all, serial':>12} {'all, parallel':>14}")
+    frames = {}
+    for engine in engines:
+        settings.EXCEL_ENGINE = engine
+        first, frames[engine] = timed(lambda: read_excel_sheet(path, None, excel_engine()), args.repeat)
+        names = FileParser.sheet_names(path)
+        serial, _ = timed(lambda: [read_excel_sheet(path, n, engine) for n in names], args.repeat)
+        parallel, _ = timed(lambda: FileParser.parse_sheets(path, names), args.repeat)
+        print(f"{engine:<10} {first:>11.2f}s {len(frames[engine]) / first:>12,.0f} {serial:>11.2f}s {parallel:>13.2f}s")
+
+    reference = frames["openpyxl"]
+    results = {f"{engine} first sheet": frames[engine] for engine in engines if engine != "openpyxl"}
+    if path.endswith(".xlsx"):
+        head_rows = min(PREVIEW_ROWS, len(reference))
+        results[f"preview head ({head_rows} rows)"] = FileParser.parse(path, nrows=head_rows)
+    mismatches = 0
+    print("\nSame frame as openpyxl:")
+    for name, df in results.items():
+        diff = differences(reference.head(len(df)), df)
+        mismatches += bool(diff)
+        print(f"  {name:<26} {'identical' if not diff else 'DIFFERENT: ' + diff}")
+
+    if tmpdir:
+        tmpdir.cleanup()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Check that DASHBOARD_ENGINE=memory returns the same dashboard as the SQL path.
+
+Runs build_dashboard through SqlDashboardQueries and DashboardSnapshot for the
+latest months and a spread of filter combinations against the configured
+database, and exits non-zero on any difference.
+
+Orderings that Postgres leaves undefined (ties in counts) or delegates to the
+database collation are normalized before comparing.
+
+Usage: python check_engine_parity.py [--months 3]
+"""
+import argparse
+import asyncio
+import sys
+from app.core.database import get_db
+from app.models.models import DashboardData
+from app.api.dashboard import SqlDashboardQueries, build_dashboard, clean_for_json
+from app.services.dashboard_engine import DashboardSnapshot
+
+def normalize(response: dict) -> dict:
+    response = clean_for_json(response)
+    charts = response["charts"]
+    for name in ("by_customer", "by_category", "by_status"):
+        charts[name] = sorted(charts[name], key=lambda x: (-x["count"], x["name"]))
+    response["root_causes"] = sorted(response["root_causes"], key=lambda x: (-x["count"], x["root_cause"]))
+    for name in ("customers", "categories", "statuses", "products"):
+        response["filters"][name] = sorted(response["filters"][name])
+    # Ties for the top item are broken arbitrarily by both engines
+    for name in ("top_category", "top_customer"):
+        if response["kpis"].get(name):
+            response["kpis"][name] = {"percent": response["kpis"][name]["percent"]}
+    return response
+
+def diff(a, b, path="") -> list[str]:
+    if isinstance(a, dict) and isinstance(b, dict):
+        out = []
+        for key in sorted(set(a) | set(b), key=str):
+            out += diff(a.get(key), b.get(key), f"{path}.{key}")
+        return out
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        out = []
+        for i, (x, y) in enumerate(zip(a, b)):
+            out += diff(x, y, f"{path}[{i}]")
+        return out
+    return [] if a == b else [f"{path}: sql={a!r} memory={b!r}"]
+
+async def filter_combinations(sql: SqlDashboardQueries, months: list[str]):
+    yield {}
+    for month in months:
+        yield {"month": month}
+        customers = await sql.distinct_values(DashboardData.customer, month)
+        categories = await sql.distinct_values(DashboardData.category, month)
+        statuses = await sql.distinct_values(DashboardData.status, month)
+        products = await sql.distinct_values(DashboardData.product, month)
+        if customers:
+            yield {"month": month, "customers": ",".join(customers[:2])}
+        if categories:
+            yield {"month": month, "categories": f"{categories[0]},Blank"}
+        if statuses:
+            yield {"month": month, "statuses": statuses[0]}
+        if products:
+            yield {"month": month, "products": products[0], "statuses": ",".join(statuses)}
+
+async def check_parity(months: int) -> int:
+    failures = 0
+    async for db in get_db():
+        sql = SqlDashboardQueries(db)
+        snapshot = await DashboardSnapshot.load(db, generation=0)
+        available = await sql.available_months()
+        if available != await snapshot.available_months():
+            print("❌ available months differ")
+            failures += 1
+
+        checked = 0
+        async for filters in filter_combinations(sql, available[:months]):
+            expected = normalize(await build_dashboard(sql, **filters))
+            actual = normalize(await build_dashboard(snapshot, **filters))
+            problems = diff(expected, actual)
+            checked += 1
+            if problems:
+                failures += 1
+                print(f"❌ {filters}")
+                for p in problems[:10]:
+                    print(f"   {p}")
+            else:
+                print(f"✅ {filters}")
+        print(f"\n{checked - failures} / {checked} filter combinations match")
+        break
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, default=3, help="Number of latest months to check")
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(check_parity(args.months)) else 0)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+End-to-end ingestion check against a real Postgres.
+
+Runs uploads through process_upload_task on a scratch database and exits
+non-zero unless:
+
+  * an append upload of a month with no partition yet finishes (creating the
+    partition must not wait on the upload's own transaction) and stores every
+    dated row
+  * a merge re-upload of the same export inserts only new keys and updates
+    only changed rows
+  * a merge upload without values for a merge key column is rejected
+  * backfill_order_numbers.py gives rows stored before merge ingestion their
+    order numbers, so a merge of their month matches them
+  * JSON array and NDJSON (.ndjson/.jsonl) uploads are stored like CSV ones
+  * a workbook source uploaded with sheets=separate or sheets=combine rebuilds
+    a removed source store from the same sheets it was ingested from
+
+The schema is created from the models, then migrations/002+ are applied as on
+an upgraded deployment. Point it at a throwaway database; it refuses one
+whose dashboard_data already has rows. Redis is not needed.
+
+Usage: python check_ingestion.py --database-url postgresql+asyncpg://u:p@localhost/ingestcheck
+"""
+import argparse
+import asyncio
+import glob
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Scratch database (postgresql+asyncpg://...)")
+    parser.add_argument("--timeout", type=float, default=30, help="Seconds an upload may take before it counts as hung")
+    return parser.parse_args()
+
+
+args = parse_args()
+workdir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = args.database_url
+os.environ["UPLOAD_DIR"] = workdir.name
+os.environ.setdefault("SECRET_KEY", "ingestion-check")
+os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:1")
+os.environ["ENVIRONMENT"] = "test"
+
+import pandas as pd  # noqa: E402
+from sqlalchemy import select, text  # noqa: E402
+from app.core.database import Base, engine, async_session  # noqa: E402
+from app.api.datasources import process_upload_task, process_workbook_task, workbook_options  # noqa: E402
+from app.models.models import DataSource  # noqa: E402
+from app.services.source_store import drop_source_store, get_source_store  # noqa: E402
+
+# Upload failures are reported through each source's status and error_message
+logging.disable(logging.CRITICAL)
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+failures = []
+
+
+def check(condition: bool, message: str):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+async def create_schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        existing = await conn.scalar(text("SELECT count(*) FROM dashboard_data"))
+        if existing:
+            sys.exit(f"dashboard_data already has {existing} rows; use an empty database")
+        raw = (await conn.get_raw_connection()).driver_connection
+        # 001 creates the base tables, which create_all already made
+        for path in sorted(glob.glob(os.path.join(MIGRATIONS, "*.sql")))[1:]:
+            with open(path) as f:
+                await raw.execute(f.read())
+
+
+def export(rows: list[tuple], name: str, with_order_no: bool = True) -> str:
+    """File in the dashboard export layout, written in the format of name's extension.
+
+    rows are (order no, day, status, production no).
+    """
+    df = pd.DataFrame(rows, columns=["Production Order No.", "Reporting day", "Status", "Production No"])
+    df["Customer"], df["Category"], df["Product"] = "Customer 1", "Category 1", "Product 1"
+    if not with_order_no:
+        df = df.drop(columns=["Production Order No."])
+    path = os.path.join(workdir.name, name)
+    if name.endswith(".csv"):
+        df.to_csv(path, index=False)
+    elif name.endswith(".xlsx"):
+        df.to_excel(path, index=False)
+    else:
+        df.to_json(path, orient="records", lines=not name.endswith(".json"))
+    return path
+
+
+async def upload(path: str, mode: str = "append", sheets: str = None) -> DataSource:
+    """Ingest path as a new source; returns the source as the task left it"""
+    async with async_session() as db:
+        source = DataSource(
+            name=os.path.basename(path), file_type=os.path.splitext(path)[1][1:], file_path=path,
+            status="pending", sheet_mode=sheets
+        )
+        db.add(source)
+        await db.commit()
+    try:
+        await asyncio.wait_for(process_upload_task(source.id, path, "dashboard", mode, sheets or "first"), args.timeout)
+    except asyncio.TimeoutError:
+        check(False, f"{os.path.basename(path)} ({mode}) finished within {args.timeout:.0f}s")
+    return await reload(source.id)
+
+
+async def reload(source_id: int) -> DataSource:
+    async with async_session() as db:
+        return (await db.execute(select(DataSource).where(DataSource.id == source_id))).scalar_one()
+
+
+async def source_rows(source_id: int) -> int:
+    async with engine.connect() as conn:
+        return await conn.scalar(text("SELECT count(*) FROM dashboard_data WHERE source_id = :id"), {"id": source_id})
+
+
+async def new_month_append():
+    rows = [(f"PO{i}", f"2024-04-{1 + i % 28:02d}", "HOLD", i) for i in range(200)] + [("PO-X", "", "HOLD", 1)]
+    source = await upload(export(rows, "april.csv"))
+    check(source.status == "ready", f"append upload of a new month is ready ({source.status}: {source.error_message})")
+    check(await source_rows(source.id) == 200, "append upload stored every dated row")
+    async with engine.connect() as conn:
+        partition = await conn.scalar(text("SELECT to_regclass('dashboard_data_y2024m04')"))
+    check(partition is not None, "append upload created the month's partition")
+
+
+async def merge_reupload():
+    rows = [(f"MO{i}", f"2024-05-{1 + i % 28:02d}", "HOLD", i) for i in range(100)]
+    first = await upload(export(rows, "may.csv"), "merge")
+    check(first.status == "ready" and first.merge_stats["inserted"] == 100,
+          f"first merge upload inserts every row ({first.status}: {first.merge_stats or first.error_message})")
+
+    rows[0] = ("MO0", rows[0][1], "FAILURE", 0)
+    rows.append(("MO100", "2024-05-30", "HOLD", 100))
+    second = await upload(export(rows, "may-2.csv"), "merge")
+    stats = second.merge_stats or {}
+    check(second.status == "ready" and (stats.get("inserted"), stats.get("updated"), stats.get("unchanged")) == (1, 1, 99),
+          f"merge re-upload inserts 1, updates 1, keeps 99 ({second.status}: {stats or second.error_message})")
+    async with engine.connect() as conn:
+        total = await conn.scalar(text("SELECT count(*) FROM dashboard_data WHERE production_order_no LIKE 'MO%'"))
+    check(total == 101, f"merge re-upload left one row per key ({total})")
+
+
+async def merge_without_key():
+    rows = [(None, "2024-06-01", "HOLD", 1), (None, "2024-06-02", "HOLD", 2)]
+    for path, label in ((export(rows, "june-no-column.csv", with_order_no=False), "missing"),
+                        (export(rows, "june-blank.csv"), "blank")):
+        source = await upload(path, "merge")
+        check(source.status == "error" and "production_order_no" in (source.error_message or ""),
+              f"merge upload with the order number column {label} is rejected ({source.status}: {source.error_message})")
+        check(await source_rows(source.id) == 0, f"rejected merge upload ({label}) stored no rows")
+
+
+async def backfill_legacy_rows():
+    rows = [(f"LO{i}", f"2024-07-{1 + i % 28:02d}", "HOLD", i) for i in range(50)]
+    legacy = await upload(export(rows, "july.csv"))
+    # As stored before migrations/004: no order number, no fingerprint
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "UPDATE dashboard_data SET production_order_no = NULL, row_hash = NULL WHERE source_id = :id"
+        ), {"id": legacy.id})
+    result = subprocess.run(
+        [sys.executable, "backfill_order_numbers.py"], cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=dict(os.environ), capture_output=True, text=True,
+    )
+    check(result.returncode == 0, f"backfill_order_numbers.py succeeds (exit {result.returncode}){result.stdout[-500:]}{result.stderr[-500:]}")
+    async with engine.connect() as conn:
+        unkeyed = await conn.scalar(text(
+            "SELECT count(*) FROM dashboard_data WHERE source_id = :id AND (production_order_no IS NULL OR row_hash IS NULL)"
+        ), {"id": legacy.id})
+    check(unkeyed == 0, f"backfill filled every legacy row ({unkeyed} left)")
+
+    merged = await upload(export(rows, "july-2.csv"), "merge")
+    stats = merged.merge_stats or {}
+    check(merged.status == "ready" and stats.get("inserted") == 0 and stats.get("unchanged") == 50,
+          f"merge over backfilled rows inserts nothing ({merged.status}: {stats or merged.error_message})")
+
+
+async def json_uploads():
+    for ext in ("json", "ndjson", "jsonl"):
+        rows = [(f"{ext.upper()}{i}", f"2024-08-{1 + i % 28:02d}", "HOLD", i) for i in range(30)]
+        source = await upload(export(rows, f"august.{ext}"))
+        check(source.status == "ready", f".{ext} upload is ready ({source.status}: {source.error_message})")
+        check(await source_rows(source.id) == 30, f".{ext} upload stored every row")
+
+
+def workbook(name: str, sheets: dict[str, int]) -> str:
+    """Workbook with one sheet of export rows per name -> row count"""
+    path = os.path.join(workdir.name, name)
+    with pd.ExcelWriter(path) as writer:
+        for sheet, count in sheets.items():
+            pd.DataFrame({
+                "Production Order No.": [f"{sheet}-{i}" for i in range(count)],
+                "Reporting day": [f"2024-09-{1 + i % 28:02d}" for i in range(count)],
+                "Customer": "Customer 1", "Status": "HOLD", "Production No": range(count),
+            }).to_excel(writer, sheet_name=sheet, index=False)
+    return path
+
+
+async def rebuilt_rows(source: DataSource) -> list[str]:
+    """Order numbers in the source's store after rebuilding it from the file"""
+    drop_source_store(source.id)
+    store = await get_source_store(source.id, source.file_path, **workbook_options(source))
+    return store.table.column("Production Order No.").to_pylist()
+
+
+async def workbook_sources():
+    path = workbook("separate.xlsx", {"First": 3, "Second": 5})
+    async with async_session() as db:
+        sources = [DataSource(name=f"separate.xlsx [{sheet}]", file_type="xlsx", file_path=path, status="pending",
+                              sheet_name=sheet, sheet_mode="separate") for sheet in ("First", "Second")]
+        db.add_all(sources)
+        await db.commit()
+    await asyncio.wait_for(process_workbook_task({s.sheet_name: s.id for s in sources}, path, "dashboard"), args.timeout)
+    second = await reload(sources[1].id)
+    rows = await rebuilt_rows(second)
+    check(second.status == "ready" and rows == [f"Second-{i}" for i in range(5)],
+          f"separate sheet source rebuilds its store from its own sheet ({second.status}: {rows})")
+
+    combined = await upload(workbook("combine.xlsx", {"First": 3, "Second": 5}), sheets="combine")
+    rows = await rebuilt_rows(combined)
+    check(combined.status == "ready" and combined.row_count == 8 and len(rows) == 8,
+          f"combined workbook source rebuilds its store from every sheet ({combined.status}: {len(rows)} rows)")
+
+
+async def main() -> int:
+    await create_schema()
+    try:
+        await new_month_append()
+        await merge_reupload()
+        await merge_without_key()
+        await backfill_legacy_rows()
+        await json_uploads()
+        await workbook_sources()
+    finally:
+        await engine.dispose()
+    print(f"\n{len(failures)} check(s) failed" if failures else "\nAll ingestion checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(main()))
+    finally:
+        workdir.cleanup()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check for the dashboard endpoints.
+
+Seeds a scratch Postgres database with synthetic dashboard_data, calls every
+dashboard endpoint for a set of filter combinations while recording each
+SELECT they issue, then runs EXPLAIN (ANALYZE, BUFFERS) on those statements
+and fails when a plan breaks a budget:
+
+  * a sequential scan on dashboard_data that throws away most of what it
+    reads (--max-filtered-ratio); scanning a whole pruned month partition is
+    expected, scanning every month to keep one is not. --strict-seqscan
+    rejects every sequential scan on dashboard_data.
+  * more shared buffers than --max-buffers
+  * execution time above --max-ms
+
+It finishes with composite index suggestions for the apply_filters column
+combinations that were exercised.
+
+Point it at a throwaway database; it creates the schema and refuses to seed
+a dashboard_data table that already has rows (use --no-seed to reuse one).
+
+Usage: python check_query_plans.py --database-url postgresql+asyncpg://u:p@localhost/plancheck
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+
+CUSTOMERS, CATEGORIES, PRODUCTS = 30, 10, 200
+# apply_filters parameter -> dashboard_data column
+FILTER_COLUMNS = {"customers": "customer", "categories": "category", "statuses": "status", "products": "product"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True, help="Scratch database (postgresql+asyncpg://...)")
+    parser.add_argument("--rows", type=int, default=300_000, help="Synthetic rows to seed")
+    parser.add_argument("--months", type=int, default=12, help="Months of history to spread rows over")
+    parser.add_argument("--no-seed", action="store_true", help="Use the data already in the database")
+    parser.add_argument("--max-buffers", type=int, default=20_000, help="Shared buffers budget per query")
+    parser.add_argument("--max-ms", type=float, default=250.0, help="Execution time budget per query")
+    parser.add_argument("--max-filtered-ratio", type=float, default=0.5,
+                        help="Max share of rows a sequential scan may discard")
+    parser.add_argument("--strict-seqscan", action="store_true", help="Fail on any sequential scan")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["DATABASE_URL"] = args.database_url
+os.environ.setdefault("SECRET_KEY", "query-plan-check")
+os.environ["ENVIRONMENT"] = "test"
+
+from datetime import date  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
+from app.core.database import Base, engine, async_session  # noqa: E402
+from app.api import dashboard  # noqa: E402
+from app.api.dashboard import SqlDashboardQueries, build_dashboard  # noqa: E402
+from app.models.models import DataSource  # noqa: E402
+from app.services.partitions import ensure_month_partitions  # noqa: E402
+
+
+# --- Seeding ---
+
+def month_starts(count: int) -> list[date]:
+    today = date.today().replace(day=1)
+    starts = []
+    for i in range(count):
+        y, m = divmod(today.year * 12 + today.month - 1 - i, 12)
+        starts.append(date(y, m + 1, 1))
+    return sorted(starts)
+
+
+async def seed(rows: int, months: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    starts = month_starts(months)
+    await ensure_month_partitions(starts)
+
+    async with async_session() as db:
+        existing = (await db.execute(text("SELECT count(*) FROM dashboard_data"))).scalar()
+        if existing:
+            sys.exit(f"dashboard_data already has {existing} rows; use --no-seed or an empty database")
+        source = DataSource(name="query-plan-check", file_type="csv", file_path="", status="ready")
+        db.add(source)
+        await db.flush()
+        end = date(starts[-1].year + (starts[-1].month == 12), starts[-1].month % 12 + 1, 1)
+        await db.execute(text(f"""
+            INSERT INTO dashboard_data (source_id, production_order_no, reporting_day, customer, category,
+                product, status, current_status, production_no, root_cause, improvement_plan)
+            SELECT :source_id, 'PO' || g,
+                   CAST(:start AS date) + floor(random() * (CAST(:end AS date) - CAST(:start AS date)))::int,
+                   'Customer ' || (1 + floor(random() * {CUSTOMERS}))::int,
+                   CASE WHEN random() < 0.05 THEN NULL ELSE 'Category ' || (1 + floor(random() * {CATEGORIES}))::int END,
+                   'Product ' || (1 + floor(random() * {PRODUCTS}))::int,
+                   (ARRAY['LOCK', 'HOLD', 'FAILURE'])[1 + floor(random() * 3)::int],
+                   CASE WHEN random() < 0.2 THEN 'CANCELED' ELSE 'RESUMED' END,
+                   floor(random() * 500)::int,
+                   CASE WHEN random() < 0.7 THEN 'Root cause ' || (1 + floor(random() * 50))::int END,
+                   'Plan ' || (1 + floor(random() * 20))::int
+            FROM generate_series(1, CAST(:rows AS integer)) g
+        """), {"source_id": source.id, "start": starts[0], "end": end, "rows": rows})
+        await db.commit()
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE dashboard_data"))
+        await conn.execute(text("ANALYZE data_sources"))
+    print(f"Seeded {rows} rows over {months} months")
+
+
+# --- Statement capture ---
+
+captured: list[tuple[str, object]] = []
+capturing = False
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    if capturing and statement.lstrip().upper().startswith("SELECT"):
+        captured.append((statement, parameters))
+
+
+async def _no_cache_get(key):
+    return None
+
+
+async def _no_cache_set(key, value, ttl=300):
+    pass
+
+
+async def endpoint_calls(months: list[str]):
+    """(label, coroutine factory) for each endpoint and filter combination"""
+    latest = months[0]
+    combos = [{}]
+    combos += [{"month": m} for m in months[:2]]
+    samples = {"customers": "Customer 1,Customer 2", "categories": "Category 1,Blank",
+               "statuses": "HOLD", "products": "Product 7"}
+    for size in (1, 2):
+        for names in itertools.combinations(samples, size):
+            combos.append({"month": latest, **{n: samples[n] for n in names}})
+
+    calls = []
+    for combo in combos:
+        calls.append((f"GET /dashboard {combo}",
+                      lambda db, c=combo: build_dashboard(SqlDashboardQueries(db), **c), combo))
+    calls.append(("GET /dashboard/decomposition", lambda db: dashboard.get_decomposition_data(db=db, month=latest), None))
+    calls.append(("GET /dashboard/comparison", lambda db: dashboard.get_comparison_data(db=db, months=6), None))
+    calls.append(("GET /dashboard/failure-trend", lambda db: dashboard.get_failure_trend(db=db, months=6), None))
+    calls.append(("GET /dashboard/drilldown", lambda db: dashboard.get_drilldown_data(
+        db=db, dimension="customer", value="Customer 1", month=latest, page=1, page_size=50), None))
+    return calls
+
+
+# --- Plan checks ---
+
+def walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def check_plan(plan: dict, opts) -> list[str]:
+    problems = []
+    root = plan["Plan"]
+    for node in walk(root):
+        relation = node.get("Relation Name", "")
+        if node["Node Type"] != "Seq Scan" or not relation.startswith("dashboard_data"):
+            continue
+        kept = node.get("Actual Rows", 0) * node.get("Actual Loops", 1)
+        removed = node.get("Rows Removed by Filter", 0) * node.get("Actual Loops", 1)
+        ratio = removed / (kept + removed) if kept + removed else 0
+        if opts.strict_seqscan or ratio > opts.max_filtered_ratio:
+            problems.append(f"Seq Scan on {relation} discards {ratio:.0%} of {kept + removed} rows")
+    buffers = root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0)
+    if buffers > opts.max_buffers:
+        problems.append(f"{buffers} shared buffers > {opts.max_buffers}")
+    if plan["Execution Time"] > opts.max_ms:
+        problems.append(f"{plan['Execution Time']:.1f} ms > {opts.max_ms} ms")
+    return problems
+
+
+async def explain(statement: str, parameters) -> dict:
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters)
+        raw = result.scalar()
+        await conn.rollback()
+    return (json.loads(raw) if isinstance(raw, str) else raw)[0]
+
+
+# --- Index suggestions ---
+
+async def suggest_indexes(combos: list[dict]) -> list[str]:
+    async with engine.connect() as conn:
+        stats = dict((await conn.execute(text(
+            "SELECT attname, n_distinct FROM pg_stats WHERE tablename = 'dashboard_data' AND inherited"
+        ))).all())
+        indexes = (await conn.execute(text(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'dashboard_data'"
+        ))).all()
+        row_count = (await conn.execute(text("SELECT reltuples FROM pg_class WHERE relname = 'dashboard_data'"))).scalar()
+
+    def distinct(col):
+        n = stats.get(col, 1) or 1
+        return n if n > 0 else -n * max(row_count or 1, 1)
+
+    def leading_columns(indexdef):
+        cols = indexdef[indexdef.index("(") + 1:indexdef.rindex(")")]
+        return [c.strip() for c in cols.split(",")]
+
+    existing = {name: leading_columns(defn) for name, defn in indexes}
+    lines, seen = [], set()
+    for combo in combos:
+        cols = [col for param, col in FILTER_COLUMNS.items() if combo.get(param)]
+        if not cols:
+            continue
+        # Most selective equality columns first, the month range last
+        cols = tuple(sorted(cols, key=distinct, reverse=True)) + ("reporting_day",)
+        if cols in seen:
+            continue
+        seen.add(cols)
+        covered = [n for n, idx in existing.items() if idx[:len(cols)] == list(cols)]
+        name = "ix_dashboard_data_" + "_".join(c.split("_")[0] for c in cols)
+        if covered:
+            lines.append(f"-- {', '.join(cols)}: covered by {covered[0]}")
+        else:
+            lines.append(f"CREATE INDEX IF NOT EXISTS {name} ON dashboard_data ({', '.join(cols)});")
+    return lines
+
+
+async def main(opts) -> int:
+    global capturing
+    if not opts.no_seed:
+        await seed(opts.rows, opts.months)
+
+    # Measure the queries, not Redis
+    dashboard.cache_get = _no_cache_get
+    dashboard.cache_set = _no_cache_set
+
+    async with async_session() as db:
+        months = await dashboard.get_available_months(db)
+    if not months:
+        print("❌ No dashboard data to check")
+        return 1
+
+    failures, combos = 0, []
+    for label, call, combo in await endpoint_calls(months):
+        if combo is not None:
+            combos.append(combo)
+        captured.clear()
+        capturing = True
+        try:
+            async with async_session() as db:
+                await call(db)
+        finally:
+            capturing = False
+
+        statements = list(dict.fromkeys((s, tuple(p) if isinstance(p, list) else p) for s, p in captured))
+        endpoint_problems = []
+        for i, (statement, parameters) in enumerate(statements, 1):
+            plan = await explain(statement, parameters)
+            for problem in check_plan(plan, opts):
+                endpoint_problems.append(f"   query {i}: {problem}\n      {' '.join(statement.split())[:160]}")
+        if endpoint_problems:
+            failures += 1
+            print(f"❌ {label} ({len(statements)} queries)")
+            print("\n".join(endpoint_problems))
+        else:
+            print(f"✅ {label} ({len(statements)} queries)")
+
+    print("\nSuggested composite indexes for apply_filters combinations:")
+    for line in await suggest_indexes(combos):
+        print(f"  {line}")
+
+    print(f"\n{failures} endpoint call(s) over budget")
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(main(args)) else 0)
@@ -1,20 +1,15 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from app.api import auth, datasources, dashboard, config, isc
 from app.core.config import settings
 from app.core.logging_config import setup_logging
+import asyncio
 import logging
 
 # Setup logging
 setup_logging(settings.ENVIRONMENT)
 logger = logging.getLogger(__name__)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
-
 app = FastAPI(
     title="VTGTOOL API",
     description="Internal Data Analytics Platform for Garment Industry",
@@ -23,10 +18,6 @@ app = FastAPI(
     redoc_url="/redoc",
 )
 
-# Add rate limiter to app state
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 logger.info(f"Starting VTGTOOL API in {settings.ENVIRONMENT} mode")
 
 # Configure CORS based on environment
@@ -52,6 +43,32 @@ app.add_middleware(
     max_age=3600,  # Cache preflight requests for 1 hour
 )
 
+@app.on_event("startup")
+async def resume_source_purges():
+    """Finish purging sources whose deletion was interrupted by a restart"""
+    from app.services.source_purge import resume_pending_purges
+    app.state.purge_task = asyncio.create_task(resume_pending_purges())
+
+@app.on_event("startup")
+async def start_isc_refresher():
+    """Load the ISC master and follow new versions in the background"""
+    from app.services.isc_store import run_isc_refresher
+    app.state.isc_refresher = asyncio.create_task(run_isc_refresher())
+
+@app.on_event("startup")
+async def start_user_cache_listener():
+    """Drop cached users invalidated by other workers or scripts"""
+    from app.core.user_cache import run_user_cache_listener
+    if settings.USER_CACHE_TTL > 0:
+        app.state.user_cache_listener = asyncio.create_task(run_user_cache_listener())
+
+@app.on_event("startup")
+async def start_config_cache_listener():
+    """Drop cached config values updated through other workers"""
+    from app.services.config_cache import run_config_cache_listener
+    if settings.CONFIG_CACHE_TTL > 0:
+        app.state.config_cache_listener = asyncio.create_task(run_config_cache_listener())
+
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["📊 Dashboard"])
 app.include_router(auth.router, prefix="/api/auth", tags=["🔐 Authentication"])
 app.include_router(datasources.router, prefix="/api/datasources", tags=["📁 Data Sources"])
@@ -66,6 +83,7 @@ async def health():
     """
     from app.core.database import engine
     from app.core.cache import get_redis
+    from app.core.security import password_hash_stats
     
     status = {
         "status": "ok",
@@ -94,4 +112,5 @@ async def health():
         logger.warning(f"Redis health check failed: {e}")
         status["cache"] = "disconnected"
     
+    status["password_hashing"] = password_hash_stats()
     return status
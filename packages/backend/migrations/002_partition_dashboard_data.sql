@@ -0,0 +1,92 @@
+-- Partition dashboard_data by reporting_day month
+-- PostgreSQL 13+
+--
+-- Every dashboard query is month-scoped, so with one partition per month the
+-- planner only touches the months a query asks for. Partitions are named
+-- dashboard_data_yYYYYmMM; ingestion creates missing ones on demand
+-- (app/services/partitions.py). Rows without a reporting day cannot be routed
+-- to a partition and are not copied; they never showed up in any month view.
+--
+-- Archive a month with:
+--   ALTER TABLE dashboard_data DETACH PARTITION dashboard_data_y2024m01;
+
+BEGIN;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_class
+        WHERE relname = 'dashboard_data' AND relkind = 'r'
+    ) THEN
+        ALTER TABLE dashboard_data RENAME TO dashboard_data_unpartitioned;
+        ALTER SEQUENCE IF EXISTS dashboard_data_id_seq RENAME TO dashboard_data_unpartitioned_id_seq;
+        ALTER INDEX IF EXISTS dashboard_data_pkey RENAME TO dashboard_data_unpartitioned_pkey;
+        -- Free the index names for the partitioned table; the old table is dropped below
+        DROP INDEX IF EXISTS ix_dashboard_data_source_id, ix_dashboard_data_reporting_day,
+            ix_dashboard_data_customer, ix_dashboard_data_category,
+            ix_dashboard_data_product, ix_dashboard_data_status;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS dashboard_data (
+    id SERIAL,
+    source_id INTEGER REFERENCES data_sources(id),
+    reporting_day DATE NOT NULL,
+    customer VARCHAR(255),
+    category VARCHAR(255),
+    product VARCHAR(255),
+    status VARCHAR(50),
+    current_status VARCHAR(50),
+    production_no INTEGER,
+    root_cause VARCHAR(500),
+    improvement_plan TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, reporting_day)
+) PARTITION BY RANGE (reporting_day);
+
+CREATE INDEX IF NOT EXISTS ix_dashboard_data_source_id ON dashboard_data(source_id);
+CREATE INDEX IF NOT EXISTS ix_dashboard_data_reporting_day ON dashboard_data(reporting_day);
+CREATE INDEX IF NOT EXISTS ix_dashboard_data_customer ON dashboard_data(customer);
+CREATE INDEX IF NOT EXISTS ix_dashboard_data_category ON dashboard_data(category);
+CREATE INDEX IF NOT EXISTS ix_dashboard_data_product ON dashboard_data(product);
+CREATE INDEX IF NOT EXISTS ix_dashboard_data_status ON dashboard_data(status);
+
+DO $$
+DECLARE
+    m DATE;
+BEGIN
+    IF to_regclass('dashboard_data_unpartitioned') IS NULL THEN
+        RETURN;
+    END IF;
+
+    FOR m IN
+        SELECT DISTINCT date_trunc('month', reporting_day)::date
+        FROM dashboard_data_unpartitioned
+        WHERE reporting_day IS NOT NULL
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF dashboard_data FOR VALUES FROM (%L) TO (%L)',
+            'dashboard_data_y' || to_char(m, 'YYYY') || 'm' || to_char(m, 'MM'),
+            m, (m + INTERVAL '1 month')::date
+        );
+    END LOOP;
+
+    INSERT INTO dashboard_data (
+        id, source_id, reporting_day, customer, category, product, status,
+        current_status, production_no, root_cause, improvement_plan, created_at
+    )
+    SELECT
+        id, source_id, reporting_day, customer, category, product, status,
+        current_status, production_no, root_cause, improvement_plan, created_at
+    FROM dashboard_data_unpartitioned
+    WHERE reporting_day IS NOT NULL;
+
+    PERFORM setval(
+        pg_get_serial_sequence('dashboard_data', 'id'),
+        GREATEST((SELECT max(id) FROM dashboard_data_unpartitioned), 1)
+    );
+
+    DROP TABLE dashboard_data_unpartitioned;
+END $$;
+
+COMMIT;
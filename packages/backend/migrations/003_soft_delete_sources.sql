@@ -0,0 +1,7 @@
+-- Soft delete for data sources
+-- deleted_at hides a source's dashboard rows immediately; the rows and the
+-- source itself are purged afterwards in background batches.
+
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_datasources_deleted ON data_sources(deleted_at) WHERE deleted_at IS NOT NULL;
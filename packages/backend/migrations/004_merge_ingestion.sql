@@ -0,0 +1,21 @@
+-- Merge ingestion: natural key column, per-upload stats and change log
+--
+-- Rows already stored get no production_order_no here; it only exists in the
+-- uploaded files. Run backfill_order_numbers.py after this migration, or the
+-- first merge upload of a month inserts a second copy of its rows.
+
+ALTER TABLE dashboard_data ADD COLUMN IF NOT EXISTS production_order_no VARCHAR(100);
+CREATE INDEX IF NOT EXISTS ix_dashboard_data_order_day ON dashboard_data(production_order_no, reporting_day);
+
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS merge_stats JSONB;
+
+CREATE TABLE IF NOT EXISTS dashboard_data_changes (
+    id SERIAL PRIMARY KEY,
+    source_id INTEGER REFERENCES data_sources(id) ON DELETE CASCADE,
+    row_id INTEGER NOT NULL,
+    reporting_day DATE NOT NULL,
+    change VARCHAR(10) NOT NULL CHECK (change IN ('insert', 'update')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_dashboard_data_changes_source_id ON dashboard_data_changes(source_id);
@@ -0,0 +1,6 @@
+-- Row fingerprints for duplicate detection across uploads, persisted validation
+
+ALTER TABLE dashboard_data ADD COLUMN IF NOT EXISTS row_hash BIGINT;
+CREATE INDEX IF NOT EXISTS ix_dashboard_data_row_hash ON dashboard_data(row_hash);
+
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS validation JSONB;
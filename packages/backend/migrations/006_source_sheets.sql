@@ -0,0 +1,4 @@
+-- Multi-sheet workbooks uploaded with sheets=separate: one source per sheet,
+-- all sharing the uploaded file
+
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS sheet_name VARCHAR(255);
@@ -0,0 +1,3 @@
+-- Per-stage ingestion timings and memory (app/services/telemetry.py)
+
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS ingest_metrics JSONB;
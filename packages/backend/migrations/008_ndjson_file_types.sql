@@ -0,0 +1,6 @@
+-- NDJSON uploads: file_type is the upload's extension, so .ndjson and .jsonl
+-- sources need their own values
+
+ALTER TABLE data_sources DROP CONSTRAINT IF EXISTS data_sources_file_type_check;
+ALTER TABLE data_sources ADD CONSTRAINT data_sources_file_type_check
+    CHECK (file_type IN ('csv', 'xlsx', 'xls', 'json', 'ndjson', 'jsonl', 'xml'));
@@ -0,0 +1,4 @@
+-- How a workbook source was read (sheets= of its upload: first, combine or
+-- separate), so its rows can be parsed again the same way
+
+ALTER TABLE data_sources ADD COLUMN IF NOT EXISTS sheet_mode VARCHAR(20);
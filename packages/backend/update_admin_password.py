@@ -3,15 +3,16 @@
 Script to update admin password with correct bcrypt hash
 """
 import asyncio
-import bcrypt
 from sqlalchemy import select, update
 from app.core.database import get_db
+from app.core.security import hash_password
+from app.core.user_cache import invalidate_user
 from app.models.models import User
 
 async def update_password():
     # Generate new password hash for "admin123"
     password = "admin123"
-    password_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    password_hash = hash_password(password)
     
     print(f"New password hash: {password_hash}")
     
@@ -21,8 +22,13 @@ async def update_password():
             update(User)
             .where(User.email == "admin@vtgtool.local")
             .values(password_hash=password_hash)
+            .returning(User.id)
         )
+        user_ids = result.scalars().all()
         await db.commit()
+        # Running workers must not keep serving sessions cached before the change
+        for user_id in user_ids:
+            await invalidate_user(user_id)
         print(f"✅ Password updated for admin@vtgtool.local")
         print(f"   Email: admin@vtgtool.local")
         print(f"   Password: {password}")